@@ -1,23 +1,31 @@
-from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
-import os
+from functools import lru_cache
+from pathlib import Path
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
-load_dotenv() # take environment variables from .env.
+# <repo root>/.env, two levels above app/config.py
+_ENV_FILE = Path(__file__).resolve().parents[2] / ".env"
 
 class Settings(BaseSettings):
-    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
-    CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+    # Values come from the process environment first, then from the repo-root
+    # .env. pydantic-settings resolves a relative env_file against the working
+    # directory (trading_backend/ when started from Run.bat), so the path is
+    # anchored to this file instead.
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CELERY_BROKER_URL: str = "redis://localhost:6379/0"
+    CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
     # Add other settings as needed
 
     # DTN IQFeed Credentials
-    DTN_PRODUCT_ID: Optional[str] = os.getenv("DTN_PRODUCT_ID")
-    DTN_LOGIN: Optional[str] = os.getenv("DTN_LOGIN")
-    DTN_PASSWORD: Optional[str] = os.getenv("DTN_PASSWORD")
+    DTN_PRODUCT_ID: Optional[str] = None
+    DTN_LOGIN: Optional[str] = None
+    DTN_PASSWORD: Optional[str] = None
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = 'utf-8'
+    model_config = SettingsConfigDict(env_file=_ENV_FILE, env_file_encoding="utf-8")
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Builds the Settings object once per process; later calls reuse it."""
+    return Settings()
+
+settings = get_settings()
@@ -0,0 +1,36 @@
+# app/core/_compile_resampling.py
+"""
+Ahead-of-time build of the OHLC resampling kernel.
+
+Run from `trading_backend/` at deploy/build time:
+
+    python -m app.core._compile_resampling
+
+This writes a `resample_mod` extension next to this file, which
+`numba_resampling_kernels` imports in place of the JIT kernel so the first
+request on a fresh worker doesn't pay Numba's compile cost.
+"""
+import os
+
+from numba.pycc import CC
+
+from .numba_resampling_kernels import _resample_ohlc_kernel
+
+cc = CC('resample_mod')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# (int64 ns timestamps, OHLCV float64 inputs, int64 ns timestamp output,
+#  five float64 outputs, bucket size in ns) -> bar count
+cc.export(
+    'resample_ohlc',
+    'i8(i8[:],f8[:],f8[:],f8[:],f8[:],f8[:],i8[:],f8[:],f8[:],f8[:],f8[:],f8[:],i8)'
+)(_resample_ohlc_kernel)
+
+# Same kernel over int64 price ticks / volume (launch_resample_ohlc(..., tick_size=...))
+cc.export(
+    'resample_ohlc_ticks',
+    'i8(i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8[:],i8)'
+)(_resample_ohlc_kernel)
+
+if __name__ == '__main__':
+    cc.compile()
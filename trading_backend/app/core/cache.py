@@ -1,7 +1,8 @@
 # app/core/cache.py
 import redis
-import json
-from typing import Optional, List, Any
+import numpy as np
+from typing import Optional, List, Dict, Tuple
+from pydantic import TypeAdapter
 from ..config import settings # Your application settings
 from .. import schemas # Your Pydantic schemas
 
@@ -9,32 +10,177 @@ from .. import schemas # Your Pydantic schemas
 REDIS_URL = settings.REDIS_URL
 redis_client = redis.Redis.from_url(REDIS_URL)
 
+# Field order of the OHLCV column dicts passed between fetch, cache and resampling.
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+# Packed OHLCV payload (per-day 1s cache and chart_data_full:* results): one
+# version byte followed by the six OHLCV_COLUMNS as consecutive native 8-byte
+# runs of equal length (a (6, n) C-order block). Row 0 holds the timestamps as
+# int64 nanoseconds since the epoch; the other rows are float64.
+# Version 1 payloads (float64 unix-second timestamps) are treated as misses.
+_OHLC_BLOCK_FORMAT_VERSION = b"\x02"
+
+def pack_ohlc_columns(columns: Dict[str, np.ndarray]) -> bytes:
+    """Serializes OHLCV columns into the versioned 8-byte block."""
+    timestamps = np.asarray(columns[OHLCV_COLUMNS[0]], dtype=np.int64)
+    block = np.empty((len(OHLCV_COLUMNS), timestamps.size), dtype=np.float64)
+    block.view(np.int64)[0] = timestamps
+    for row, name in enumerate(OHLCV_COLUMNS[1:], start=1):
+        block[row] = columns[name]
+    return _OHLC_BLOCK_FORMAT_VERSION + block.tobytes()
+
+def unpack_ohlc_columns(payload: bytes) -> Dict[str, np.ndarray]:
+    """
+    Inverse of pack_ohlc_columns. Returns read-only views over `payload` (no copy);
+    raises ValueError for payloads in any other format.
+    """
+    if payload[:1] != _OHLC_BLOCK_FORMAT_VERSION or (len(payload) - 1) % (8 * len(OHLCV_COLUMNS)):
+        raise ValueError("Unrecognized packed OHLCV payload")
+    block = np.frombuffer(payload, dtype=np.float64, offset=1).reshape(len(OHLCV_COLUMNS), -1)
+    columns = dict(zip(OHLCV_COLUMNS, block))
+    columns[OHLCV_COLUMNS[0]] = block[0].view(np.int64)
+    return columns
+
+# Built once at import: constructing a TypeAdapter compiles its validator/serializer.
+_CANDLE_LIST_ADAPTER = TypeAdapter(List[schemas.Candle])
+
+def columns_to_candles(
+    timestamps: np.ndarray, open_: np.ndarray, high: np.ndarray,
+    low: np.ndarray, close: np.ndarray, volume: np.ndarray
+) -> List[schemas.Candle]:
+    """
+    Builds Candle models from parallel columns (int64 ns timestamps, float64
+    OHLCV) in a single validate_python pass over one zip of the columns. The
+    timestamps are converted to unix seconds in one vectorized step and double
+    as `unix_timestamp`, so no per-candle conversion is needed.
+    """
+    unix_seconds = timestamps / 1e9
+    return _CANDLE_LIST_ADAPTER.validate_python([
+        {"timestamp": t, "unix_timestamp": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(
+            unix_seconds.tolist(), open_.tolist(), high.tolist(),
+            low.tolist(), close.tolist(), volume.tolist()
+        )
+    ])
+
 # Define a cache expiration time for user-specific data (e.g., 35 minutes)
 CACHE_EXPIRATION_SECONDS = 60 * 35
 
-def get_cached_ohlc_data(cache_key: str) -> Optional[List[schemas.Candle]]:
-    """Attempts to retrieve and deserialize OHLC data from Redis cache."""
-    cached_data = redis_client.get(cache_key)
-    if cached_data:
+# TTLs for full-range results ("chart_data_full:...:{interval}"). Fine intervals
+# are large and cheap to rebuild from the per-day 1s cache, so they go first;
+# coarse intervals are a few KB and are kept longer. Never shorter than a session.
+INTERVAL_CACHE_TTL_SECONDS = {
+    "1s": 1800, "5s": 1800, "10s": 1800, "15s": 1800, "30s": 1800, "45s": 1800,
+    "1m": 3600, "5m": 3600, "10m": 3600, "15m": 3600,
+    "30m": 7200, "45m": 7200, "1h": 7200, "1d": 21600
+}
+DEFAULT_INTERVAL_CACHE_TTL_SECONDS = 3600
+
+def interval_cache_ttl(interval: str) -> int:
+    return INTERVAL_CACHE_TTL_SECONDS.get(interval, DEFAULT_INTERVAL_CACHE_TTL_SECONDS)
+
+# A session's registry set must outlive every data key it lists, including the
+# longest full-range TTL above; otherwise cleanup loses track of those keys.
+SESSION_DATA_KEYS_EXPIRATION_SECONDS = max(
+    CACHE_EXPIRATION_SECONDS, DEFAULT_INTERVAL_CACHE_TTL_SECONDS, *INTERVAL_CACHE_TTL_SECONDS.values()
+)
+
+# Session keys ("session:{token}") carry the session timeout as their TTL and
+# every heartbeat resets it, so Redis itself expires idle sessions; the value is
+# only a presence marker.
+SESSION_KEY_EXPIRATION_SECONDS = 60 * 30
+SESSION_KEY_VALUE = b"1"
+
+# Registry sets that let the cleanup task find sessions and their data keys
+# without SCANning the keyspace: ACTIVE_SESSIONS_KEY holds every session token,
+# and session_data_keys_key(token) the "user:{token}:*" and
+# "chart_data_full:{token}:*" keys written for it.
+ACTIVE_SESSIONS_KEY = "sessions:active"
+
+def session_data_keys_key(session_token: str) -> str:
+    return f"session_keys:{session_token}"
+
+def register_session_data_keys(pipe, session_token: str, keys: List[str]) -> None:
+    """
+    Queues SADDs recording `keys` under the session's registry set on `pipe`.
+    The set's TTL is refreshed to outlive every key it lists.
+    """
+    registry_key = session_data_keys_key(session_token)
+    pipe.sadd(registry_key, *keys)
+    pipe.expire(registry_key, SESSION_DATA_KEYS_EXPIRATION_SECONDS)
+
+def get_cached_ohlc_data_raw(cache_key: str) -> Optional[bytes]:
+    """Returns the stored payload bytes as-is (see pack_ohlc_columns), or None."""
+    return redis_client.get(cache_key)
+
+def get_cached_ohlc_columns(cache_key: str) -> Optional[Dict[str, np.ndarray]]:
+    """Returns packed OHLCV columns stored under `cache_key`, or None if absent/unreadable."""
+    payload = get_cached_ohlc_data_raw(cache_key)
+    if payload:
         try:
-            # Assuming data is stored as a JSON string of a list of candle dicts
-            deserialized_data = json.loads(cached_data)
-            # Convert list of dicts back to list of Pydantic models
-            return [schemas.Candle(**item) for item in deserialized_data]
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"Error deserializing cached data for key {cache_key}: {e}")
+            return unpack_ohlc_columns(payload)
+        except ValueError as e:
+            print(f"Error unpacking cached data for key {cache_key}: {e}")
             return None
     return None
 
-def set_cached_ohlc_data(cache_key: str, data: List[schemas.Candle], expiration: int = CACHE_EXPIRATION_SECONDS):
-    """Serializes and stores OHLC data in Redis cache with an expiration."""
-    try:
-        # Convert list of Pydantic models to list of dicts for JSON serialization
-        serializable_data = [item.model_dump(mode='json') for item in data] # Pydantic v2
-        # serializable_data = [item.dict() for item in data] # Pydantic v1
-        redis_client.set(cache_key, json.dumps(serializable_data), ex=expiration)
-    except TypeError as e:
-        print(f"Error serializing data for cache key {cache_key}: {e}")
+def get_cached_ohlc_columns_slice(
+    cache_key: str, start: int, stop: int
+) -> Optional[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    Reads only rows [start:stop) of the packed OHLCV columns under `cache_key`
+    with GETRANGE, so paging through a large result transfers O(stop - start)
+    bytes instead of the whole payload. Returns (total_rows, columns), or None
+    if the key is absent/unreadable.
+    """
+    column_count = len(OHLCV_COLUMNS)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.strlen(cache_key)
+    pipe.getrange(cache_key, 0, 0)
+    payload_length, version = pipe.execute()
+    if not payload_length or version != _OHLC_BLOCK_FORMAT_VERSION or (payload_length - 1) % (8 * column_count):
+        return None
+
+    total_rows = (payload_length - 1) // (8 * column_count)
+    start = min(max(start, 0), total_rows)
+    stop = min(max(stop, start), total_rows)
+    if start == stop:
+        columns = {name: np.empty(0, dtype=np.float64) for name in OHLCV_COLUMNS}
+        columns[OHLCV_COLUMNS[0]] = np.empty(0, dtype=np.int64)
+        return total_rows, columns
+
+    # Each column is a contiguous run of total_rows 8-byte values after the version byte.
+    pipe = redis_client.pipeline(transaction=False)
+    for row in range(column_count):
+        column_offset = 1 + row * total_rows * 8
+        pipe.getrange(cache_key, column_offset + start * 8, column_offset + stop * 8 - 1)
+    raw_columns = pipe.execute()
+    if any(len(raw) != (stop - start) * 8 for raw in raw_columns):
+        # Expired or replaced between the two round-trips.
+        return None
+
+    columns = {name: np.frombuffer(raw, dtype=np.float64) for name, raw in zip(OHLCV_COLUMNS, raw_columns)}
+    columns[OHLCV_COLUMNS[0]] = columns[OHLCV_COLUMNS[0]].view(np.int64)
+    return total_rows, columns
+
+def set_cached_ohlc_data_raw(cache_key: str, payload: bytes, expiration: int = CACHE_EXPIRATION_SECONDS):
+    """Stores an already-serialized payload, so cache hits skip re-validation."""
+    redis_client.set(cache_key, payload, ex=expiration)
+
+def set_many_cached_ohlc_data_raw(payloads: Dict[str, Tuple[bytes, int]], session_token: Optional[str] = None):
+    """
+    Stores several already-serialized payloads, given as {key: (payload, expiration)},
+    in one non-transactional pipeline (one round-trip). Pass `session_token` for
+    session-scoped keys so they are registered for cleanup in the same pipeline.
+    """
+    if not payloads:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for cache_key, (payload, expiration) in payloads.items():
+        pipe.set(cache_key, payload, ex=expiration)
+    if session_token:
+        register_session_data_keys(pipe, session_token, list(payloads))
+    pipe.execute()
 
 def build_ohlc_cache_key(
     exchange: str,
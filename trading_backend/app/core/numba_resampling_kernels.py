@@ -1,98 +1,343 @@
+"""
+OHLC resampling of sorted 1-second bars.
+
+All aggregation should go through `launch_resample_ohlc` rather than pandas
+`DataFrame.resample(...).ohlc()`: pandas pays Python overhead per group and
+its `open` handling differs from what the charts expect. The parallel Numba
+kernel is used when Numba (or the AOT `resample_mod` build) is available;
+otherwise the NumPy `reduceat` implementation produces identical bars.
+
+Every process that imports this module (the API and the Celery worker) warms
+the kernels at startup via `warm_up_resampling_kernels`, so Numba is imported
+eagerly here rather than deferred to the first resample.
+
+Timestamps are int64 nanoseconds since the epoch (`datetime64[ns].view('i8')`)
+on the way in and on the way out, so bucketing is pure integer arithmetic and
+no float conversion or precision loss happens anywhere in the pipeline.
+"""
+import threading
+from typing import Dict, Iterable, Literal, Optional
+
 import numpy as np
-import numba
 
-@numba.jit(nopython=True)
-def resample_ohlc_cpu_jit(
+try:
+    import numba
+except ImportError:  # the NumPy path below is used instead
+    numba = None
+
+NANOS_PER_SECOND = 1_000_000_000
+
+# Plain `range` keeps the kernel source importable without Numba installed.
+prange = numba.prange if numba is not None else range
+
+def _resample_ohlc_kernel(
     timestamps_1s, open_1s, high_1s, low_1s, close_1s, volume_1s,
     out_timestamps, out_open, out_high, out_low, out_close, out_volume,
-    aggregation_seconds: int
+    bucket_size: int
 ):
     """
     Performs OHLC resampling on sorted 1-second data using Numba for CPU acceleration.
+    Pass 1 is a cheap serial scan that records where every time bucket starts;
+    pass 2 reduces each bucket independently across cores with `prange`.
     """
-    if len(timestamps_1s) == 0:
+    num_1s_records = len(timestamps_1s)
+    if num_1s_records == 0:
         return 0
 
-    # Initialize variables for the first aggregated bar
-    current_bar_idx = 0
-    # Determine the start of the very first time bucket
-    bucket_start_ts = np.floor(timestamps_1s[0] / aggregation_seconds) * aggregation_seconds
-    
-    # Set the timestamp and open for the first bar
-    out_timestamps[current_bar_idx] = bucket_start_ts
-    out_open[current_bar_idx] = open_1s[0]
-    out_high[current_bar_idx] = high_1s[0]
-    out_low[current_bar_idx] = low_1s[0]
-    out_close[current_bar_idx] = close_1s[0]
-    out_volume[current_bar_idx] = volume_1s[0]
-
-    # Loop through the rest of the 1-second data
-    for i in range(1, len(timestamps_1s)):
-        ts = timestamps_1s[i]
-        
-        # Check if this 1s bar belongs to a new time bucket
-        if ts >= bucket_start_ts + aggregation_seconds:
-            # Current bar is complete, start a new one
-            current_bar_idx += 1
-            bucket_start_ts = np.floor(ts / aggregation_seconds) * aggregation_seconds
-            
-            # Initialize the new bar
-            out_timestamps[current_bar_idx] = bucket_start_ts
-            out_open[current_bar_idx] = open_1s[i]
-            out_high[current_bar_idx] = high_1s[i]
-            out_low[current_bar_idx] = low_1s[i]
-            out_volume[current_bar_idx] = 0.0 # Reset volume for summing
-        
-        # Update high, low, close, and volume for the current aggregated bar
-        if high_1s[i] > out_high[current_bar_idx]:
-            out_high[current_bar_idx] = high_1s[i]
-        
-        if low_1s[i] < out_low[current_bar_idx]:
-            out_low[current_bar_idx] = low_1s[i]
-            
-        out_close[current_bar_idx] = close_1s[i] # Always update with the latest close
-        out_volume[current_bar_idx] += volume_1s[i]
-
-    # Return the total number of complete aggregated bars created
-    # The actual count is index + 1
-    return current_bar_idx + 1
+    # Pass 1: find the first 1s row of every time bucket (plus an end sentinel).
+    # The output buffers are sized to the bucket count bound, so reuse it here.
+    segment_starts = np.empty(len(out_timestamps) + 1, dtype=np.int64)
+    segment_starts[0] = 0
+    num_bars = 1
+    # Timestamps and bucket_size share a unit (int64 ns), so one integer
+    # division per row yields the bucket id and the boundary check is a plain
+    # integer compare.
+    current_bucket = timestamps_1s[0] // bucket_size
+    for i in range(1, num_1s_records):
+        bucket = timestamps_1s[i] // bucket_size
+        if bucket != current_bucket:
+            segment_starts[num_bars] = i
+            num_bars += 1
+            current_bucket = bucket
+    segment_starts[num_bars] = num_1s_records
+
+    # Pass 2: every bar only reads its own segment and writes its own slot,
+    # so there is no cross-iteration dependency and prange is safe.
+    for j in prange(num_bars):
+        s = segment_starts[j]
+        e = segment_starts[j + 1]
+
+        # Seed from the first row so the accumulators keep the input dtype
+        # (float64 prices or int64 ticks).
+        bar_high = high_1s[s]
+        bar_low = low_1s[s]
+        bar_volume = volume_1s[s]
+        for i in range(s + 1, e):
+            if high_1s[i] > bar_high:
+                bar_high = high_1s[i]
+            if low_1s[i] < bar_low:
+                bar_low = low_1s[i]
+            bar_volume += volume_1s[i]
+
+        out_timestamps[j] = (timestamps_1s[s] // bucket_size) * bucket_size
+        out_open[j] = open_1s[s]
+        out_high[j] = bar_high
+        out_low[j] = bar_low
+        out_close[j] = close_1s[e - 1]
+        out_volume[j] = bar_volume
+
+    return num_bars
+
+
+_kernels = None
+_kernels_lock = threading.Lock()
+
+# Numba's "workqueue" threading layer is not threadsafe: two threads entering
+# parallel regions at once abort the process (tbb and omp are fine). The parallel
+# JIT kernel is therefore serialized on this lock until the first call shows
+# which layer Numba picked, and for good if that is workqueue. The AOT build is
+# serial and never takes it.
+_kernel_call_lock = threading.Lock()
+_serialize_kernel_calls = False
+
+def _load_kernels() -> tuple:
+    """
+    Returns (float64 kernel, int64-ticks kernel), resolving them on first use.
+    Either entry is None when neither the AOT build nor Numba is available.
+    """
+    global _kernels, _serialize_kernel_calls
+    if _kernels is not None:
+        return _kernels
+    with _kernels_lock:
+        if _kernels is None:
+            try:
+                # Ahead-of-time build from `python -m app.core._compile_resampling`:
+                # importing it costs nothing, so cold workers skip JIT compilation
+                # entirely. pycc builds are serial, so the cached parallel JIT
+                # kernel remains the fallback.
+                from .resample_mod import resample_ohlc, resample_ohlc_ticks
+                _kernels = (resample_ohlc, resample_ohlc_ticks)
+            except ImportError:
+                if numba is None:
+                    _kernels = (None, None)
+                else:
+                    # nogil: the event loop and other request threads keep running
+                    # while a resample is in flight.
+                    jit_kernel = numba.njit(
+                        parallel=True, fastmath=True, cache=True, boundscheck=False, nogil=True
+                    )(_resample_ohlc_kernel)
+                    # The JIT dispatcher specializes per dtype, so int64 ticks use the same kernel.
+                    # Set before publishing _kernels: a thread that sees the
+                    # kernels must also see that calls are serialized.
+                    _serialize_kernel_calls = True
+                    _kernels = (jit_kernel, jit_kernel)
+    return _kernels
+
+
+def _threading_layer_is_threadsafe() -> bool:
+    try:
+        return numba.threading_layer() != "workqueue"
+    except ValueError:  # no parallel region has run yet
+        return False
+
+
+def warm_up_resampling_kernels() -> None:
+    """
+    Loads/compiles the resampling kernels and runs them once on a tiny input, so
+    the first real request doesn't pay Numba's JIT (or cache-load) latency.
+    `aggregation_seconds` is a runtime argument, so one call per signature
+    covers every interval. Only float64 prices are warmed, both writable and
+    read-only (columns unpacked from the cache are read-only views and the JIT
+    dispatcher specializes on writability); nothing resamples int64 ticks yet,
+    so that specialization is left to compile on first use. Call from process
+    startup, not import, to keep imports cheap.
+    """
+    if not USE_NUMBA_KERNEL:
+        return
+    ts = np.arange(2, dtype=np.int64) * NANOS_PER_SECOND
+    prices = np.ones(2, dtype=np.float64)
+    launch_resample_ohlc(ts, prices, prices, prices, prices, prices, 60)
+    cached_ts, cached_prices = ts.copy(), prices.copy()
+    cached_ts.setflags(write=False)
+    cached_prices.setflags(write=False)
+    launch_resample_ohlc(cached_ts, cached_prices, cached_prices, cached_prices, cached_prices, cached_prices, 60)
+
+
+def quantize_prices(prices: np.ndarray, tick_size: float) -> np.ndarray:
+    """Converts float prices to int64 tick counts (price / tick_size, rounded)."""
+    return np.rint(np.asarray(prices, dtype=np.float64) / tick_size).astype(np.int64)
+
+def dequantize_prices(ticks: np.ndarray, tick_size: float) -> np.ndarray:
+    """Converts int64 tick counts back to float64 prices."""
+    return ticks.astype(np.float64) * tick_size
+
+
+# The parallel Numba kernel is the default whenever it is available; flip this to
+# use the single-threaded vectorized NumPy path instead.
+USE_NUMBA_KERNEL = True
+
+OpenMode = Literal["first_in_bucket", "prev_close"]
+
+
+def _resample_numpy(
+    timestamps_1s: np.ndarray, open_1s: np.ndarray, high_1s: np.ndarray,
+    low_1s: np.ndarray, close_1s: np.ndarray, volume_1s: np.ndarray,
+    bucket_size: int
+) -> tuple:
+    """
+    Resamples sorted 1-second data with NumPy segment reductions.
+    Each bucket is a contiguous run of rows, so high/low/volume reduce with
+    `reduceat` over the run starts and open/close are plain fancy indexing.
+    """
+    bucket_ids = np.floor_divide(timestamps_1s, bucket_size)
+    starts = np.concatenate(([0], np.nonzero(np.diff(bucket_ids))[0] + 1))
+    ends = np.r_[starts[1:] - 1, len(close_1s) - 1]
+
+    return (
+        bucket_ids[starts] * bucket_size,
+        open_1s[starts],
+        np.maximum.reduceat(high_1s, starts),
+        np.minimum.reduceat(low_1s, starts),
+        close_1s[ends],
+        np.add.reduceat(volume_1s, starts),
+        len(starts)
+    )
+
+
+def _finalize_columns(columns: tuple, tick_size: Optional[float], open_mode: OpenMode) -> tuple:
+    """Applies `open_mode` and maps (o, h, l, c, v) back to float64 prices/volume."""
+    ts, o, h, l, c, v = columns
+    if open_mode == "prev_close" and len(o) > 1:
+        o = o.copy()
+        o[1:] = c[:-1]
+    elif open_mode not in ("first_in_bucket", "prev_close"):
+        raise ValueError(f"Unknown open_mode: {open_mode!r}")
+    if tick_size is None:
+        return ts, o, h, l, c, v
+    return (
+        ts,
+        dequantize_prices(o, tick_size), dequantize_prices(h, tick_size),
+        dequantize_prices(l, tick_size), dequantize_prices(c, tick_size),
+        v.astype(np.float64),
+    )
 
 
 def launch_resample_ohlc(
     timestamps_1s: np.ndarray, open_1s: np.ndarray, high_1s: np.ndarray, 
     low_1s: np.ndarray, close_1s: np.ndarray, volume_1s: np.ndarray,
-    aggregation_seconds: int
+    aggregation_seconds: int, tick_size: Optional[float] = None,
+    open_mode: OpenMode = "first_in_bucket"
 ) -> tuple:
+    """
+    Resamples sorted 1s OHLCV data into `aggregation_seconds` bars.
+    `timestamps_1s` are int64 nanoseconds since the epoch. Returns (timestamps,
+    open, high, low, close, volume, bar_count): int64 ns bar-start timestamps
+    and float64 OHLCV.
+
+    Pass `tick_size` when the price arrays are already int64 tick counts (see
+    quantize_prices): the reduction then runs on int64 ticks and only the bars
+    returned are converted back to float prices.
+
+    `open_mode="prev_close"` makes each bar open at the previous bar's close
+    (gapless bars); the first bar keeps its first-in-bucket open.
+    """
 
     num_1s_records = len(timestamps_1s)
     if num_1s_records == 0:
-        return (np.array([]),) * 6 + (0,) # Return 6 empty arrays and count 0
+        # Return 6 empty arrays and count 0
+        return (np.empty(0, dtype=np.int64),) + (np.empty(0, dtype=np.float64),) * 5 + (0,)
+
+    # Bucket on int64 nanoseconds: integer division only, no FP divide/floor per row.
+    # Inputs are normalized to C-contiguous columns of the kernel's exact dtypes
+    # (a no-op for cached/fetched columns), so the warmed specializations are
+    # the ones every call dispatches to.
+    timestamps_1s = np.ascontiguousarray(timestamps_1s, dtype=np.int64)
+    # The kernel sizes its outputs from the first/last bucket and runs without
+    # bounds checks, so out-of-order rows would write past the output buffers.
+    if not np.all(timestamps_1s[1:] >= timestamps_1s[:-1]):
+        raise ValueError("timestamps_1s must be sorted in ascending order")
+    volume_1s = np.ascontiguousarray(volume_1s, dtype=np.float64)
+    bucket_size = aggregation_seconds * NANOS_PER_SECOND
+
+    f64_kernel, ticks_kernel = _load_kernels() if USE_NUMBA_KERNEL else (None, None)
+    if tick_size is not None:
+        # Everything runs in int64: ticks for prices, whole units for volume.
+        block_dtype = np.dtype(np.int64)
+        kernel = ticks_kernel
+        volume_1s = np.rint(volume_1s).astype(np.int64, copy=False)
+    else:
+        block_dtype = np.dtype(np.float64)
+        kernel = f64_kernel
+    open_1s, high_1s, low_1s, close_1s = (
+        np.ascontiguousarray(column, dtype=block_dtype) for column in (open_1s, high_1s, low_1s, close_1s)
+    )
 
-    # Estimate max possible output bars. A generous upper bound is num_1s_records.
-    max_out_bars = num_1s_records
+    if kernel is None:
+        result = _resample_numpy(
+            timestamps_1s, open_1s, high_1s, low_1s, close_1s, volume_1s,
+            bucket_size
+        )
+        return _finalize_columns(result[:6], tick_size, open_mode) + (result[6],)
 
-    # Allocate output host arrays
-    out_timestamps_host = np.zeros(max_out_bars, dtype=np.float64)
-    out_open_host = np.zeros(max_out_bars, dtype=np.float64)
-    out_high_host = np.zeros(max_out_bars, dtype=np.float64)
-    out_low_host = np.zeros(max_out_bars, dtype=np.float64)
-    out_close_host = np.zeros(max_out_bars, dtype=np.float64)
-    out_volume_host = np.zeros(max_out_bars, dtype=np.float64)
+    # Tight bound on output bars: the number of buckets spanned by the data,
+    # never more than one bar per input row.
+    first_bucket = int(timestamps_1s[0]) // bucket_size
+    last_bucket = int(timestamps_1s[-1]) // bucket_size
+    max_out_bars = min(last_bucket - first_bucket + 1, num_1s_records)
 
-    # Call the Numba JIT-compiled function
-    actual_bars = resample_ohlc_cpu_jit(
+    # Outputs are allocated per call: results leave this function anyway, and
+    # retained scratch would pin the largest request's buffers in every worker
+    # thread. Timestamps get their own int64 column; the five OHLCV columns live
+    # in one (5, max_out_bars) block whose rows are contiguous columns.
+    out_timestamps_host = np.empty(max_out_bars, dtype=np.int64)
+    out_block_host = np.empty((5, max_out_bars), dtype=block_dtype)
+    out_open_host, out_high_host, out_low_host, out_close_host, out_volume_host = out_block_host
+    kernel_args = (
         timestamps_1s, open_1s, high_1s, low_1s, close_1s, volume_1s,
         out_timestamps_host, out_open_host, out_high_host, out_low_host, out_close_host, out_volume_host,
-        aggregation_seconds
+        bucket_size
     )
-    
-    # Trim the output arrays to the actual number of bars produced
-    return (
-        out_timestamps_host[:actual_bars], 
-        out_open_host[:actual_bars], 
-        out_high_host[:actual_bars], 
-        out_low_host[:actual_bars], 
-        out_close_host[:actual_bars], 
-        out_volume_host[:actual_bars],
-        actual_bars
-    )
\ No newline at end of file
+
+    # Call the Numba JIT-compiled (parallel) function
+    global _serialize_kernel_calls
+    if _serialize_kernel_calls:
+        with _kernel_call_lock:
+            actual_bars = kernel(*kernel_args)
+            _serialize_kernel_calls = not _threading_layer_is_threadsafe()
+    else:
+        actual_bars = kernel(*kernel_args)
+
+    if actual_bars == max_out_bars:
+        result_timestamps, result_block = out_timestamps_host, out_block_host
+    else:
+        # Trim to the bars produced so the unused capacity isn't kept alive.
+        result_timestamps = out_timestamps_host[:actual_bars].copy()
+        result_block = out_block_host[:, :actual_bars].copy()
+
+    return _finalize_columns((result_timestamps, *result_block), tick_size, open_mode) + (actual_bars,)
+
+
+def launch_resample_ohlc_multi(
+    timestamps_1s: np.ndarray, open_1s: np.ndarray, high_1s: np.ndarray,
+    low_1s: np.ndarray, close_1s: np.ndarray, volume_1s: np.ndarray,
+    aggregation_seconds_list: Iterable[int]
+) -> Dict[int, tuple]:
+    """
+    Resamples the same sorted 1s OHLCV data into several intervals at once.
+    Returns {aggregation_seconds: launch_resample_ohlc(...) result}.
+
+    Intervals are built finest first, and each one is resampled from the
+    coarsest already-built interval that divides it evenly instead of from the
+    1s input: bars are aligned to epoch multiples of their interval, so they
+    nest exactly inside the coarser buckets. Only the finest interval(s) scan
+    the full 1s columns; e.g. 1h is built from the 30m bars.
+    """
+    results: Dict[int, tuple] = {}
+    for aggregation_seconds in sorted(set(aggregation_seconds_list)):
+        source = (timestamps_1s, open_1s, high_1s, low_1s, close_1s, volume_1s)
+        for built_seconds in sorted(results, reverse=True):
+            if aggregation_seconds % built_seconds == 0:
+                source = results[built_seconds][:6]
+                break
+        results[aggregation_seconds] = launch_resample_ohlc(*source, aggregation_seconds)
+    return results
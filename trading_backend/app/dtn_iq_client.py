@@ -4,37 +4,114 @@ from . import pyiqfeed as iq
 from .config import settings
 import time
 import os
+import socket
+import threading
+import queue
+from contextlib import contextmanager
 
 is_iqfeed_service_launched = False
 iqfeed_launch_error = None
 
+# Connected HistoryConns kept around between requests, so lookups skip the
+# socket connect + protocol handshake and several can run concurrently.
+HISTORY_CONN_POOL_SIZE = 4
+HISTORY_CONN_PREWARM = 2
+_history_conn_pool: "queue.Queue[iq.HistoryConn]" = queue.Queue(maxsize=HISTORY_CONN_POOL_SIZE)
+
+# A successful admin-port probe is trusted for this long before re-probing, so
+# back-to-back history requests don't each pay a TCP handshake.
+ADMIN_PROBE_TTL_SECONDS = 5.0
+_admin_probe_lock = threading.Lock()
+_last_admin_probe_ok_ts = float("-inf")
+
+# (Re)launches are single-flight: history fetches run on several threads, and
+# only one of them may drive FeedService.launch() and update the launch status
+# at a time. Threads that waited on the lock while another one launched reuse
+# that attempt's outcome (tracked by _launch_attempts) instead of re-probing
+# and launching again.
+_launch_lock = threading.Lock()
+_launch_attempts = 0
+
+def _wait_for_admin_port(timeout: float = 2.0, poll_interval: float = 0.01) -> bool:
+    """
+    Polls the IQFeed admin port until it accepts a TCP connection.
+    Returns as soon as the port is open, or False once `timeout` seconds pass.
+    """
+    address = (iq.FeedConn.host, iq.FeedConn.admin_port)
+    deadline = time.monotonic() + timeout
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            if sock.connect_ex(address) == 0:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
 def _check_admin_port_connectivity():
     """
     Tries to connect to the IQFeed admin port.
     Returns True if successful, False otherwise, along with an error message if any.
     """
     try:
-        conn_check = iq.AdminConn(name="AdminPortCheckInternal")
-        conn_check.connect() # Defaults to localhost:9300
-        # A very short sleep to see if connection holds, then check attribute
-        time.sleep(0.5) # Reduced from 1-2 seconds for a quicker check
-        if conn_check.connected:
+        # A raw socket probe is all that's needed to know IQConnect is listening;
+        # no AdminConn (reader thread, handshake) and no fixed sleep.
+        if _wait_for_admin_port():
             logging.debug("Admin port check: Successfully connected.")
-            conn_check.disconnect()
             return True, None
-        else:
-            # conn_check.disconnect() # Clean up
-            logging.warning("Admin port check: connect() called but 'connected' attribute is False.")
-            return False, "AdminConn reported not connected after connect() call."
-    except ConnectionRefusedError as e_refused:
-        logging.warning(f"Admin port check: ConnectionRefusedError: {e_refused}")
-        return False, f"ConnectionRefusedError: {e_refused}"
+        logging.warning("Admin port check: admin port did not accept a connection in time.")
+        return False, "IQFeed admin port did not accept a connection within the timeout."
     except Exception as e_conn:
         logging.error(f"Admin port check: Exception during connection attempt: {e_conn}", exc_info=True)
         return False, f"Exception during admin port connection attempt: {e_conn}"
 
+def _cached_admin_port_check():
+    """
+    Same contract as _check_admin_port_connectivity, but reuses a successful
+    probe for ADMIN_PROBE_TTL_SECONDS. Failures are never cached.
+    """
+    global _last_admin_probe_ok_ts
+    with _admin_probe_lock:
+        now = time.monotonic()
+        if now - _last_admin_probe_ok_ts < ADMIN_PROBE_TTL_SECONDS:
+            return True, None
+        is_connected, conn_err = _check_admin_port_connectivity()
+        if is_connected:
+            _last_admin_probe_ok_ts = now
+        return is_connected, conn_err
+
 def launch_iqfeed_service_if_needed(force_launch_attempt=False):
-    global is_iqfeed_service_launched, iqfeed_launch_error
+    global _launch_attempts
+    with _launch_lock:
+        _launch_iqfeed_service_locked(force_launch_attempt)
+        _launch_attempts += 1
+
+def _relaunch_iqfeed_single_flight() -> bool:
+    """
+    Brings IQFeed back up after a failed connectivity check, with at most one
+    launch in flight. Returns whether the service is (now) running.
+    """
+    global is_iqfeed_service_launched, iqfeed_launch_error, _launch_attempts
+    attempts_seen = _launch_attempts
+    with _launch_lock:
+        if _launch_attempts != attempts_seen:
+            # Another thread launched while this one waited; share its result.
+            return is_iqfeed_service_launched
+        # Re-check under the lock: IQFeed may have come back on its own.
+        is_connected_now, _ = _cached_admin_port_check()
+        if is_connected_now:
+            is_iqfeed_service_launched = True
+            iqfeed_launch_error = None
+            return True
+        # Mark as not launched to ensure the launch attempt runs fully
+        is_iqfeed_service_launched = False
+        _launch_iqfeed_service_locked(force_launch_attempt=True) # Force an attempt to bring it up
+        _launch_attempts += 1
+        return is_iqfeed_service_launched
+
+def _launch_iqfeed_service_locked(force_launch_attempt=False):
+    """Body of launch_iqfeed_service_if_needed; callers hold _launch_lock."""
+    global is_iqfeed_service_launched, iqfeed_launch_error, _last_admin_probe_ok_ts
 
     if is_iqfeed_service_launched and not force_launch_attempt:
         # If already marked as launched and we are not forcing a re-launch,
@@ -71,15 +148,18 @@ def launch_iqfeed_service_if_needed(force_launch_attempt=False):
         )
         logging.info("Issuing FeedService.launch(headless=False)... (Observe EC2 desktop for GUI)")
         svc.launch(headless=False) # Keep headless=False for now for visual debugging on EC2
-        logging.info("IQFeed FeedService.launch() command issued. Waiting for client to initialize (1s)...")
-        time.sleep(1)
+        logging.info("IQFeed FeedService.launch() command issued. Waiting for the admin port to open...")
 
-        # After attempting launch, check connectivity
+        # After attempting launch, poll until the admin port accepts connections
         is_connected_after_launch, conn_error_msg = _check_admin_port_connectivity()
         if is_connected_after_launch:
             logging.info("Successfully connected to IQFeed admin port after FeedService launch/check.")
             is_iqfeed_service_launched = True
             iqfeed_launch_error = None
+            with _admin_probe_lock:
+                # Fetch threads queued behind this launch can skip their own probe.
+                _last_admin_probe_ok_ts = time.monotonic()
+            _prewarm_history_conn_pool(HISTORY_CONN_PREWARM)
         else:
             iqfeed_launch_error = (f"Failed to connect after FeedService.launch(). Error: {conn_error_msg}. "
                                    "Ensure IQLink.exe started (check EC2 desktop), logged in without issues, "
@@ -101,15 +181,11 @@ def get_iqfeed_history_conn() -> iq.HistoryConn | None:
 
     # Step 1: Perform a live connectivity check, as IQFeed might have idled out
     logging.debug("get_iqfeed_history_conn: Performing live connectivity check to IQFeed admin port.")
-    is_connected_now, conn_err = _check_admin_port_connectivity()
+    is_connected_now, conn_err = _cached_admin_port_check()
 
     if not is_connected_now:
         logging.warning(f"get_iqfeed_history_conn: Live connectivity check failed ({conn_err}). Attempting to (re)launch IQFeed service.")
-        # Mark as not launched to ensure launch_iqfeed_service_if_needed tries fully
-        is_iqfeed_service_launched = False 
-        launch_iqfeed_service_if_needed(force_launch_attempt=True) # Force an attempt to bring it up
-        
-        if not is_iqfeed_service_launched: # Check status after the launch attempt
+        if not _relaunch_iqfeed_single_flight(): # Check status after the launch attempt
             logging.error(f"get_iqfeed_history_conn: Failed to establish IQFeed service after re-launch attempt. Error: {iqfeed_launch_error}")
             return None
         else:
@@ -138,4 +214,73 @@ def get_iqfeed_history_conn() -> iq.HistoryConn | None:
     
 # Add a getter function for clarity if preferred, or import directly
 def get_iqfeed_service_status():
-    return is_iqfeed_service_launched, iqfeed_launch_error
\ No newline at end of file
+    return is_iqfeed_service_launched, iqfeed_launch_error
+
+
+def _close_history_conn(hist_conn: iq.HistoryConn) -> None:
+    try:
+        hist_conn.disconnect()
+    except Exception as e:
+        logging.warning(f"Error while disconnecting pooled HistoryConn: {e}")
+
+def _prewarm_history_conn_pool(count: int) -> None:
+    """Opens up to `count` HistoryConns into the pool right after IQFeed comes up."""
+    for _ in range(count):
+        if _history_conn_pool.full():
+            return
+        try:
+            hist_conn = iq.HistoryConn(name="TradingAppHistConn")
+            hist_conn.connect()
+        except Exception as e:
+            logging.warning(f"Could not pre-warm HistoryConn pool: {e}")
+            return
+        try:
+            _history_conn_pool.put_nowait(hist_conn)
+        except queue.Full:
+            _close_history_conn(hist_conn)
+            return
+
+@contextmanager
+def borrow_history_conn():
+    """
+    Yields a connected HistoryConn from the pool, opening a new one if the pool
+    is empty, or None if the IQFeed service is unavailable. Connections whose
+    reader thread is still alive go back to the pool on exit; broken ones (or
+    overflow beyond HISTORY_CONN_POOL_SIZE) are disconnected.
+    """
+    hist_conn = None
+    while hist_conn is None:
+        try:
+            pooled = _history_conn_pool.get_nowait()
+        except queue.Empty:
+            break
+        if pooled.reader_running():
+            hist_conn = pooled
+        else:
+            _close_history_conn(pooled)
+
+    if hist_conn is None:
+        hist_conn = get_iqfeed_history_conn()
+        if hist_conn is not None:
+            try:
+                hist_conn.connect()
+            except Exception as e:
+                logging.error(f"borrow_history_conn: Failed to connect HistoryConn: {e}", exc_info=True)
+                hist_conn = None
+
+    if hist_conn is None:
+        yield None
+        return
+
+    try:
+        yield hist_conn
+    finally:
+        # Request-level errors (e.g. NoDataError) leave the socket usable; a dead
+        # reader thread is the signal that the connection itself is gone.
+        if hist_conn.reader_running():
+            try:
+                _history_conn_pool.put_nowait(hist_conn)
+            except queue.Full:
+                _close_history_conn(hist_conn)
+        else:
+            _close_history_conn(hist_conn)
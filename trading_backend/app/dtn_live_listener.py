@@ -45,7 +45,7 @@ class PlatformLiveBarListener(iq.SilentBarListener):
 
     # You might want a helper to parse bar_data to your CandleBase schema
     # def _parse_bar_data(self, bar_data_item: np.void) -> Optional[schemas.CandleBase]:
-    #     # Similar to parse_iqfeed_bar_data in historical_data_service.py
+    #     # Similar to the bar parsing in historical_data_service.fetch_from_dtn_iq_api
     #     # but adapted for the live bar data structure if it differs, or reusable
     #     try:
     #         # Assuming bar_data_item is a single element from the np.ndarray
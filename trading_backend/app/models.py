@@ -3,7 +3,7 @@ from typing import List, Optional, Dict, Any, Literal, Union # Added Union
 from pydantic import BaseModel, Field, validator, field_validator
 
 # Suggested update (ensure imports are correct):
-from sqlalchemy import Column, String, DateTime, Float, Integer, Index, UniqueConstraint
+from sqlalchemy import Column, String, BigInteger, Float, Integer, Index, UniqueConstraint
 # from .database import Base # Assuming Base is in database.py; it's defined in your file for now.
 from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
@@ -15,7 +15,9 @@ class OHLC(Base):
     exchange = Column(String(50), nullable=False)
     token = Column(String(50), nullable=False)
     interval = Column(String(10), nullable=False) # e.g., '1s', '5m', '1h', '1d'
-    timestamp = Column(DateTime, nullable=False)
+    # UTC epoch seconds. Integer compares keep range scans and index pages cheap and
+    # avoid building a datetime per row on bulk reads; convert only at the API edge.
+    timestamp = Column(BigInteger, nullable=False)
 
     open = Column(Float, nullable=False)
     high = Column(Float, nullable=False)
@@ -24,10 +26,14 @@ class OHLC(Base):
     volume = Column(Float, nullable=True)
 
     # This composite unique constraint is essential for INSERT ... ON DUPLICATE KEY UPDATE.
-    # This index will also serve most query needs.
+    # It also indexes the filter columns, so no separate filter-only index is needed.
+    # The covering index trails the OHLCV columns after the filter columns so InnoDB
+    # can answer range SELECTs from the secondary index alone, without a clustered
+    # (PK) lookup per row.
     __table_args__ = (
         UniqueConstraint("exchange", "token", "interval", "timestamp", name="uq_ohlc_exchange_token_interval_timestamp"),
-        Index("idx_ohlc_query_all_filters", "exchange", "token", "interval", "timestamp") # Covers all main query filters
+        Index("idx_ohlc_covering", "exchange", "token", "interval", "timestamp",
+              "open", "high", "low", "close", "volume"),
     )
 
     def __repr__(self):
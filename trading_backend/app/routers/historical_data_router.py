@@ -1,8 +1,10 @@
 # chaitanyamurarka/trading_platform_v3.1/trading_platform_v3.1-fd71c9072644cabd20e39b57bf2d47b25107e752/trading_backend/app/routers/historical_data_router.py
-from fastapi import APIRouter, Depends, Query, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
-from typing import List, Optional
+from typing import Literal
+
+from fastapi.responses import ORJSONResponse
 
 from .. import schemas
 from ..services import historical_data_service
@@ -12,7 +14,22 @@ router = APIRouter(
     tags=["Historical Data"]
 )
 
-@router.get("/", response_model=schemas.HistoricalDataResponse)
+CandleLayout = Literal["rows", "columnar"]
+LAYOUT_QUERY_DESCRIPTION = (
+    "'rows' returns a list of candle objects; 'columnar' returns "
+    "{t, o, h, l, c, v} arrays (t = unix seconds), which is much cheaper to encode."
+)
+
+def _render_candle_response(response) -> ORJSONResponse:
+    # Columnar responses come back from the service as plain dicts of arrays.
+    if isinstance(response, dict):
+        return ORJSONResponse(content=response)
+    return ORJSONResponse(content=response.model_dump())
+
+# The candle endpoints skip response_model validation: the service already builds
+# validated models, and re-validating thousands of candles per response is pure
+# overhead. The schema is still advertised to OpenAPI via `responses`.
+@router.get("/", response_model=None, responses={200: {"model": schemas.HistoricalDataResponse}})
 async def fetch_initial_historical_data(
     background_tasks: BackgroundTasks,
     session_token: str = Query(..., description="The user's session token."),
@@ -21,7 +38,8 @@ async def fetch_initial_historical_data(
     interval: schemas.Interval = Query(..., description="Data interval (e.g., '1m', '5m', '1d')"),
     start_time: datetime = Query(..., description="Start datetime for the data range (ISO format, e.g., '2023-01-01T00:00:00')"),
     end_time: datetime = Query(..., description="End datetime for the data range (ISO format, e.g., '2023-01-01T12:00:00')"),
-):
+    layout: CandleLayout = Query("rows", description=LAYOUT_QUERY_DESCRIPTION),
+) -> ORJSONResponse:
     """
     Retrieve the initial chunk of historical OHLC data.
     The server processes the entire range, caches it, and returns the most recent data.
@@ -30,29 +48,36 @@ async def fetch_initial_historical_data(
     if start_time >= end_time:
         raise HTTPException(status_code=400, detail="start_time must be earlier than end_time")
 
-    response = historical_data_service.get_initial_historical_data(
+    # The service blocks on Redis/DTN and does the resampling; run it on the
+    # threadpool so it doesn't stall the event loop for other requests.
+    response = await run_in_threadpool(
+        historical_data_service.get_initial_historical_data,
         background_tasks=background_tasks,
         session_token=session_token,
         exchange=exchange,
         token=token,
         interval_val=interval.value,
         start_time=start_time,
-        end_time=end_time
+        end_time=end_time,
+        columnar=layout == "columnar"
     )
-    return response
+    return _render_candle_response(response)
 
-@router.get("/chunk", response_model=schemas.HistoricalDataChunkResponse)
+@router.get("/chunk", response_model=None, responses={200: {"model": schemas.HistoricalDataChunkResponse}})
 async def fetch_historical_data_chunk(
     request_id: str = Query(..., description="The unique ID of the data request session."),
     offset: int = Query(..., ge=0, description="The starting index of the data to fetch."),
-    limit: int = Query(5000, ge=1, le=10000, description="The number of candles to fetch.")
-):
+    limit: int = Query(5000, ge=1, le=10000, description="The number of candles to fetch."),
+    layout: CandleLayout = Query("rows", description=LAYOUT_QUERY_DESCRIPTION),
+) -> ORJSONResponse:
     """
     Retrieve a subsequent chunk of historical OHLC data that has already been processed.
     """
-    response = historical_data_service.get_historical_data_chunk(
+    response = await run_in_threadpool(
+        historical_data_service.get_historical_data_chunk,
         request_id=request_id,
         offset=offset,
-        limit=limit
+        limit=limit,
+        columnar=layout == "columnar"
     )
-    return response
\ No newline at end of file
+    return _render_candle_response(response)
\ No newline at end of file
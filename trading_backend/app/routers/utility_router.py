@@ -3,8 +3,7 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, List
 import os
 import uuid
-import time
-from ..core.cache import redis_client
+from ..core.cache import redis_client, SESSION_KEY_VALUE, SESSION_KEY_EXPIRATION_SECONDS, ACTIVE_SESSIONS_KEY
 from .. import schemas
 
 router = APIRouter(
@@ -59,21 +58,33 @@ router = APIRouter(
 @router.get("/session/initiate", response_model=schemas.SessionInfo)
 def initiate_session():
     """Generates a new unique session token for the client."""
-    session_token = str(uuid.uuid4())
-    # Store the creation time/last heartbeat time in Redis with an expiration
-    # The expiration here is a safety net. The cleanup task is the primary mechanism.
-    redis_client.set(f"session:{session_token}", int(time.time()), ex=60*45) # 45 min expiry
-    return schemas.SessionInfo(session_token=session_token)
+    # The key's TTL is the session timeout: Redis expires it unless heartbeats
+    # keep refreshing it, so no Python-side last-seen bookkeeping is needed.
+    # NX guards against ever overwriting a live session on a (vanishingly rare) UUID collision.
+    while True:
+        session_token = str(uuid.uuid4())
+        created = redis_client.set(
+            f"session:{session_token}", SESSION_KEY_VALUE,
+            ex=SESSION_KEY_EXPIRATION_SECONDS, nx=True
+        )
+        if created:
+            # Registered so the cleanup task can find the session's data without a SCAN
+            redis_client.sadd(ACTIVE_SESSIONS_KEY, session_token)
+            return schemas.SessionInfo(session_token=session_token)
 
 @router.post("/session/heartbeat")
 def session_heartbeat(session: schemas.SessionInfo):
     """Client posts to this endpoint to keep the session alive."""
     token_key = f"session:{session.session_token}"
-    if redis_client.exists(token_key):
-        # Update the timestamp and reset the expiration
-        redis_client.set(token_key, int(time.time()), ex=60*45) # Reset TTL to 45 mins
+    # XX only updates an existing key, so this single round-trip both checks that
+    # the session exists and resets its TTL.
+    updated = redis_client.set(
+        token_key, SESSION_KEY_VALUE,
+        ex=SESSION_KEY_EXPIRATION_SECONDS, xx=True
+    )
+    if updated:
         return {"status": "ok"}
     else:
         # If the key doesn't exist (e.g., expired or invalid token),
         # the client should probably re-initiate a session.
-        return {"status": "error", "message": "Session not found or expired."}
\ No newline at end of file
+        return {"status": "error", "message": "Session not found or expired."}
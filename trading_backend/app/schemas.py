@@ -1,5 +1,5 @@
 # chaitanyamurarka/trading_platform_v3.1/trading_platform_v3.1-fd71c9072644cabd20e39b57bf2d47b25107e752/trading_backend/app/schemas.py
-from pydantic import BaseModel, Field, model_validator 
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from enum import Enum
@@ -30,14 +30,9 @@ class CandleBase(BaseModel):
     low: float
     close: float
     volume: Optional[float] = None
-    unix_timestamp: Optional[float] = None # New field for UNIX timestamp
-
-    @model_validator(mode='after')
-    def calculate_unix_timestamp(self) -> 'CandleBase':
-        """Calculates UNIX timestamp from the datetime timestamp."""
-        if self.timestamp:
-            self.unix_timestamp = self.timestamp.timestamp()
-        return self
+    # UNIX seconds for the charts. Filled in by whoever builds the candle (usually
+    # straight from a float64 timestamp column) instead of a per-object validator.
+    unix_timestamp: Optional[float] = None
 
 class Candle(CandleBase):
     """Schema for a single OHLC data point, including ORM mode."""
@@ -1,23 +1,22 @@
 # chaitanyamurarka/trading_platform_v3.1/trading_platform_v3.1-fd71c9072644cabd20e39b57bf2d47b25107e752/trading_backend/app/services/historical_data_service.py
 from .. import pyiqfeed as iq
-from ..dtn_iq_client import get_iqfeed_history_conn, is_iqfeed_service_launched # Add is_iqfeed_service_launched
+from ..dtn_iq_client import borrow_history_conn, HISTORY_CONN_POOL_SIZE
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date as datetime_date, timezone
-from typing import List, Optional ,Dict# Ensure Optional is imported if not already
+from typing import Any, List, Optional, Dict, Tuple, Union
 from app.core.numba_resampling_kernels import launch_resample_ohlc # Your Numba/CUDA launcher
-from .. import schemas, models
-from ..core.cache import get_cached_ohlc_data, set_cached_ohlc_data, build_ohlc_cache_key, redis_client
-from ..dtn_iq_client import get_iqfeed_history_conn # NEW IMPORT
+from .. import schemas
+from ..core.cache import (
+    build_ohlc_cache_key, columns_to_candles, redis_client, register_session_data_keys,
+    OHLCV_COLUMNS, pack_ohlc_columns, unpack_ohlc_columns, get_cached_ohlc_columns, get_cached_ohlc_columns_slice,
+    set_many_cached_ohlc_data_raw, interval_cache_ttl,
+)
 import logging
 import numpy as np
 import pandas as pd
-import json
 from ..core.cache import redis_client,CACHE_EXPIRATION_SECONDS
-from pydantic import TypeAdapter # Added for bulk Pydantic model creation
 from fastapi import BackgroundTasks,HTTPException # Add this import
-from sqlalchemy import text # Add for raw SQL if needed for other parts, though CRUD should handle most
-import uuid
 from ..tasks.data_processing_tasks import resample_and_cache_all_intervals_task
 
 # import time # time module was imported but not used in the provided file, can be removed if not needed elsewhere
@@ -32,45 +31,10 @@ def map_interval_to_iqfeed_params(interval_val: str) -> Optional[Dict[str, any]]
     logging.warning(f"Interval '{interval_val}' not mapped for DTN fetch params (or not intraday).")
     return None
 
-def parse_iqfeed_bar_data(bar_data_item: np.void, interval_val: str) -> Optional[schemas.CandleBase]:
-    """
-    Parses a single row of IQFeed historical bar data (from numpy structured array)
-    into a CandleBase schema.
-    The dtype of bar_data_item depends on the request (daily vs intraday).
-    """
-    try:
-        dt_only_date = bar_data_item['date'].astype(datetime_date) 
-        
-        if 'time' in bar_data_item.dtype.names: # Intraday bars
-            time_val_timedelta64 = bar_data_item['time'] # This is numpy.timedelta64[us]
-            
-            # Convert numpy.timedelta64[us] to an integer number of microseconds
-            microseconds_offset_np = time_val_timedelta64.astype(np.int64)
-            # Explicitly convert numpy.int64 to Python int for timedelta
-            microseconds_offset_py = int(microseconds_offset_np) 
-            
-            ts_value = datetime.combine(dt_only_date, datetime.min.time()) + timedelta(microseconds=microseconds_offset_py)
-        else: # Daily bars
-            ts_value = datetime.combine(dt_only_date, datetime.min.time())
-
-        volume = 0
-        if 'prd_vlm' in bar_data_item.dtype.names: 
-            volume = float(bar_data_item['prd_vlm'])
-        elif 'tot_vlm' in bar_data_item.dtype.names: 
-            logging.warning(f"Using 'tot_vlm' as fallback for volume for {bar_data_item['date']} interval {interval_val}, ensure this is correct.")
-            volume = float(bar_data_item['tot_vlm'])
-
-        return schemas.CandleBase(
-            timestamp=ts_value,
-            open=float(bar_data_item['open_p']),
-            high=float(bar_data_item['high_p']),
-            low=float(bar_data_item['low_p']),
-            close=float(bar_data_item['close_p']),
-            volume=volume,
-        )
-    except (KeyError, ValueError, TypeError, AttributeError) as e:
-        logging.error(f"Error parsing IQFeed bar item: {bar_data_item!r}. Error: {e}", exc_info=True)
-        return None
+def _empty_ohlcv_columns() -> Dict[str, np.ndarray]:
+    columns = {name: np.empty(0, dtype=np.float64) for name in OHLCV_COLUMNS}
+    columns["timestamp"] = np.empty(0, dtype=np.int64)
+    return columns
 
 # In app/services/historical_data_service.py
 def fetch_from_dtn_iq_api(
@@ -78,18 +42,21 @@ def fetch_from_dtn_iq_api(
     interval_val: str,
     start_time: datetime,
     end_time: datetime,
-) -> List[schemas.CandleBase]:
+) -> Dict[str, np.ndarray]:
+    """
+    Fetches bars from IQFeed and returns them as columns keyed by OHLCV_COLUMNS
+    (int64 ns timestamps, float64 OHLCV). Empty columns when nothing came back.
+    """
     logging.info(f"Attempting to fetch from DTN IQFeed for {trading_symbol}, Interval: {interval_val}, Period: {start_time} to {end_time}")
 
-    hist_conn = get_iqfeed_history_conn()
-    if not hist_conn:
-        logging.error("DTN IQFeed History Connection not available. Cannot fetch from IQFeed.")
-        return []
-
-    candles_from_iqfeed: List[schemas.CandleBase] = []
+    columns_from_iqfeed = _empty_ohlcv_columns()
     
     try:
-        with iq.ConnConnector([hist_conn]): 
+        with borrow_history_conn() as hist_conn:
+            if not hist_conn:
+                logging.error("DTN IQFeed History Connection not available. Cannot fetch from IQFeed.")
+                return columns_from_iqfeed
+
             api_response_data = None
             if interval_val == "1d":
                 logging.debug(f"Requesting daily data for {trading_symbol} from {start_time.date()} to {end_time.date()}")
@@ -103,7 +70,7 @@ def fetch_from_dtn_iq_api(
                 iq_interval_params = map_interval_to_iqfeed_params(interval_val)
                 if not iq_interval_params:
                     logging.error(f"Could not map interval '{interval_val}' to IQFeed parameters for {trading_symbol}.")
-                    return []
+                    return columns_from_iqfeed
 
                 logging.debug(f"Requesting intraday bars for {trading_symbol}, type: {iq_interval_params['interval_type']}, len: {iq_interval_params['interval_len']}, from {start_time} to {end_time}")
                 api_response_data = hist_conn.request_bars_in_period(
@@ -117,75 +84,69 @@ def fetch_from_dtn_iq_api(
             
             if api_response_data is None or (isinstance(api_response_data, list) and not api_response_data):
                 logging.info(f"No data or empty list returned from IQFeed for {trading_symbol} ({interval_val}).")
-                return []
+                return columns_from_iqfeed
             elif isinstance(api_response_data, np.ndarray):
                 if api_response_data.size == 0:
                     logging.info(f"Empty NumPy array returned from IQFeed for {trading_symbol} ({interval_val}).")
-                    return []
+                    return columns_from_iqfeed
 
                 logging.info(f"Received {len(api_response_data)} records from IQFeed for {trading_symbol} ({interval_val}). Processing with optimized parsing...")
 
+                # Coerced to datetime64[ns] up front so daily (datetime64[D]) and
+                # intraday bars share one code path: the range bounds compare in
+                # the same unit and the int64 ns columns below are a plain view.
                 if 'time' in api_response_data.dtype.names:
-                    timestamps_dt64 = api_response_data['date'] + api_response_data['time']
+                    timestamps_dt64 = (api_response_data['date'] + api_response_data['time']).astype('datetime64[ns]')
                 else:
-                    timestamps_dt64 = api_response_data['date']
-
-                start_time_naive = start_time.replace(tzinfo=None)
-                end_time_naive = end_time.replace(tzinfo=None)
-                
-                start_time_np = np.datetime64(start_time_naive)
-                end_time_np = np.datetime64(end_time_naive)
+                    timestamps_dt64 = api_response_data['date'].astype('datetime64[ns]')
 
-                if timestamps_dt64.dtype == np.dtype('datetime64[D]'):
-                    start_time_np = start_time_np.astype('datetime64[D]')
-                    end_time_np = end_time_np.astype('datetime64[D]')
-                
-                mask = (timestamps_dt64 >= start_time_np) & (timestamps_dt64 <= end_time_np)
-                filtered_data = api_response_data[mask]
+                if interval_val == "1d":
+                    # Daily bars are stamped at midnight, so the range is whole days.
+                    start_time_np = np.datetime64(start_time.date(), 'ns')
+                    end_time_np = np.datetime64(end_time.date(), 'ns')
+                else:
+                    start_time_np = np.datetime64(start_time.replace(tzinfo=None), 'ns')
+                    end_time_np = np.datetime64(end_time.replace(tzinfo=None), 'ns')
+
+                # Requested with ascend=True, so the in-range rows are one contiguous
+                # slice: two binary searches, no boolean mask or gather copies.
+                lo = np.searchsorted(timestamps_dt64, start_time_np, side='left')
+                hi = np.searchsorted(timestamps_dt64, end_time_np, side='right')
+                filtered_data = api_response_data[lo:hi]
                 
                 if filtered_data.size == 0:
                     logging.info(f"No data remains for {trading_symbol} after time filtering ({start_time} to {end_time}).")
-                    return []
+                    return columns_from_iqfeed
 
-                filtered_timestamps_dt64 = timestamps_dt64[mask]
+                filtered_timestamps_dt64 = timestamps_dt64[lo:hi]
 
-                python_timestamps = pd.to_datetime(filtered_timestamps_dt64, utc=True).to_pydatetime()
-
-                open_prices = filtered_data['open_p'].astype(float)
-                high_prices = filtered_data['high_p'].astype(float)
-                low_prices = filtered_data['low_p'].astype(float)
-                close_prices = filtered_data['close_p'].astype(float)
+                # IQFeed bar times are naive; they are treated as UTC throughout.
+                # Kept as int64 ns end to end (cache, resampling); only the
+                # candles handed to the API are converted to unix seconds.
+                timestamps_ns = filtered_timestamps_dt64.view(np.int64)
 
                 if 'prd_vlm' in filtered_data.dtype.names:
-                    volumes = filtered_data['prd_vlm'].astype(float)
+                    volumes = filtered_data['prd_vlm'].astype(np.float64)
                 elif 'tot_vlm' in filtered_data.dtype.names:
-                    volumes = filtered_data['tot_vlm'].astype(float)
+                    volumes = filtered_data['tot_vlm'].astype(np.float64)
                     logging.warning(f"Using 'tot_vlm' as fallback for volume for {trading_symbol}, interval {interval_val}.")
                 else:
-                    volumes = np.zeros(filtered_data.size, dtype=float)
-
-                list_of_dicts = []
-                for i in range(filtered_data.size):
-                    list_of_dicts.append({
-                        "timestamp": python_timestamps[i],
-                        "open": open_prices[i],
-                        "high": high_prices[i],
-                        "low": low_prices[i],
-                        "close": close_prices[i],
-                        "volume": volumes[i]
-                    })
-
-                if list_of_dicts:
-                    candle_adapter = TypeAdapter(List[schemas.CandleBase])
-                    candles_from_iqfeed = candle_adapter.validate_python(list_of_dicts)
-                else:
-                    candles_from_iqfeed = []
+                    volumes = np.zeros(filtered_data.size, dtype=np.float64)
+
+                columns_from_iqfeed = {
+                    "timestamp": timestamps_ns,
+                    "open": filtered_data['open_p'].astype(np.float64, copy=False),
+                    "high": filtered_data['high_p'].astype(np.float64, copy=False),
+                    "low": filtered_data['low_p'].astype(np.float64, copy=False),
+                    "close": filtered_data['close_p'].astype(np.float64, copy=False),
+                    "volume": volumes,
+                }
                 
-                logging.info(f"Optimized parsing complete, {len(candles_from_iqfeed)} candles mapped for {trading_symbol} ({interval_val}).")
+                logging.info(f"Optimized parsing complete, {filtered_data.size} bars mapped for {trading_symbol} ({interval_val}).")
 
             else:
                 logging.warning(f"Unexpected data type from IQFeed: {type(api_response_data)} for {trading_symbol}")
-                return []
+                return columns_from_iqfeed
 
     except iq.NoDataError:
         logging.info(f"IQFeed: NoDataError for {trading_symbol} interval {interval_val} from {start_time} to {end_time}.")
@@ -197,7 +158,7 @@ def fetch_from_dtn_iq_api(
             exc_info=True,
         )
     
-    return candles_from_iqfeed
+    return columns_from_iqfeed
 
 INTERVAL_SECONDS_MAP = {
     "1s": 1, "5s": 5, "10s": 10, "15s": 15, "30s": 30, "45s": 45,
@@ -205,6 +166,57 @@ INTERVAL_SECONDS_MAP = {
     "30m": 1800, "45m": 2700, "1h": 3600, "1d": 86400
 }
 
+_EPOCH_DATE = datetime_date(1970, 1, 1)
+_NANOS_PER_DAY = 86400 * 1_000_000_000
+
+def _day_slices(timestamps: np.ndarray) -> Dict[int, slice]:
+    """
+    Maps each UTC day number (days since the epoch) present in sorted int64 ns
+    `timestamps` to the slice of rows falling on that day.
+    """
+    day_idx = timestamps // _NANOS_PER_DAY
+    boundaries = np.flatnonzero(np.diff(day_idx)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [day_idx.size]))
+    return {int(day_idx[start]): slice(int(start), int(end)) for start, end in zip(starts, ends)}
+
+def _contiguous_date_runs(dates: List[datetime_date]) -> List[Tuple[datetime_date, datetime_date]]:
+    """Groups dates into (run_start, run_end) pairs of consecutive calendar days."""
+    runs: List[Tuple[datetime_date, datetime_date]] = []
+    for day in sorted(dates):
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+def _write_day_caches(session_token: str, day_cache_entries: List[Tuple[str, Dict[str, np.ndarray]]]) -> None:
+    """Packs and stores per-day 1s columns (and registers the keys for session cleanup) in one Redis pipeline."""
+    logging.info(f"Queueing {len(day_cache_entries)} daily records into Redis pipeline for caching.")
+    pipe = redis_client.pipeline()
+    for day_cache_key, day_columns in day_cache_entries:
+        pipe.set(day_cache_key, pack_ohlc_columns(day_columns), ex=CACHE_EXPIRATION_SECONDS)
+    if session_token:
+        register_session_data_keys(pipe, session_token, [day_cache_key for day_cache_key, _ in day_cache_entries])
+    pipe.execute()
+    logging.info("Redis pipeline execution complete.")
+
+# Concurrent DTN fetches per request; matches the HistoryConn pool so every
+# worker can reuse a pooled connection.
+DTN_FETCH_MAX_WORKERS = HISTORY_CONN_POOL_SIZE
+
+def _fetch_1s_run(token: str, run_start_date: datetime_date, run_end_date: datetime_date) -> Dict[str, np.ndarray]:
+    """Fetches 1s bars for the whole days run_start_date..run_end_date."""
+    fetch_start_time = datetime.combine(run_start_date, datetime.min.time())
+    fetch_end_time = datetime.combine(run_end_date, datetime.max.time())
+    logging.info(f"Fetching missing 1s data from DTN for range: {fetch_start_time} to {fetch_end_time}")
+    return fetch_from_dtn_iq_api(
+        trading_symbol=token,
+        interval_val="1s",
+        start_time=fetch_start_time,
+        end_time=fetch_end_time
+    )
+
 def _get_and_prepare_1s_data_for_range(
     background_tasks: BackgroundTasks,
     session_token: str,
@@ -212,28 +224,36 @@ def _get_and_prepare_1s_data_for_range(
     token: str,
     start_time: datetime,
     end_time: datetime
-) -> List[schemas.CandleBase]:
-    all_1s_candles = []
+) -> Dict[str, np.ndarray]:
+    """
+    Collects 1s bars for [start_time, end_time] from the per-day cache, fetching
+    (and caching) any missing days from DTN. Returns sorted columns keyed by
+    OHLCV_COLUMNS (int64 ns timestamps), ready for launch_resample_ohlc.
+    """
+    # Keyed by the first calendar day each part covers (a cached day, or the
+    # start of a fetched run), so concatenating in key order keeps time order.
+    column_parts: Dict[datetime_date, Dict[str, np.ndarray]] = {}
     date_range = pd.date_range(start_time.date(), end_time.date())
-    
-    cache_keys_to_check = [
-        build_ohlc_cache_key(exchange, token, "1s", day.strftime('%Y-%m-%d'), session_token=session_token)
-        for day in date_range
-    ]
+    # Day strings are formatted once (vectorized) and the keys reused for the write-back.
+    # Only the date suffix varies per day, so the key prefix is built once.
+    range_days = date_range.date
+    day_key_prefix = build_ohlc_cache_key(exchange, token, "1s", "", session_token=session_token)
+    cache_keys_to_check = [day_key_prefix + date_str for date_str in date_range.strftime('%Y-%m-%d').tolist()]
+    cache_key_by_day = dict(zip(range_days, cache_keys_to_check))
     
     logging.info(f"Performing parallel cache check for {len(cache_keys_to_check)} keys.")
     cached_results = redis_client.mget(cache_keys_to_check)
     
     missing_dates = []
-    for i, result in enumerate(cached_results):
-        day = date_range[i].date()
+    for day, result in zip(range_days, cached_results):
         if result:
             logging.debug(f"Cache hit for 1s data on {day}")
             try:
-                deserialized = json.loads(result)
-                if deserialized: 
-                    all_1s_candles.extend([schemas.CandleBase(**item) for item in deserialized])
-            except (json.JSONDecodeError, TypeError):
+                # Payloads in an older format fail to unpack and are refetched.
+                day_columns = unpack_ohlc_columns(result)
+                if day_columns["timestamp"].size:
+                    column_parts[day] = day_columns
+            except ValueError:
                 logging.warning(f"Could not parse cached 1s data for {day}. Refetching.")
                 missing_dates.append(day)
         else:
@@ -241,121 +261,164 @@ def _get_and_prepare_1s_data_for_range(
             missing_dates.append(day)
 
     if missing_dates:
-        fetch_start_date = min(missing_dates)
-        fetch_end_date = max(missing_dates)
-        
-        fetch_start_time = datetime.combine(fetch_start_date, datetime.min.time())
-        fetch_end_time = datetime.combine(fetch_end_date, datetime.max.time())
+        day_cache_entries: List[Tuple[str, Dict[str, np.ndarray]]] = []
+        # One DTN request per run of consecutive missing days, so days that are
+        # already cached between two gaps aren't pulled and re-cached again.
+        # Runs are fetched concurrently (network-bound, each thread borrows its own
+        # pooled HistoryConn); results are merged on this thread.
+        missing_runs = _contiguous_date_runs(missing_dates)
+        with ThreadPoolExecutor(max_workers=min(DTN_FETCH_MAX_WORKERS, len(missing_runs))) as executor:
+            future_to_run = {
+                executor.submit(_fetch_1s_run, token, run_start_date, run_end_date): (run_start_date, run_end_date)
+                for run_start_date, run_end_date in missing_runs
+            }
+            completed_runs = [(future_to_run[future], future.result()) for future in as_completed(future_to_run)]
+
+        for (run_start_date, run_end_date), newly_fetched_data in completed_runs:
+            if not newly_fetched_data["timestamp"].size:
+                continue
+            run_days = pd.date_range(run_start_date, run_end_date).date
+
+            column_parts[run_start_date] = newly_fetched_data
+            # Bars arrive sorted, so each UTC day is one contiguous slice of the run.
+            day_slices = _day_slices(newly_fetched_data["timestamp"])
+            
+            for day in run_days:
+                day_slice = day_slices.get((day - _EPOCH_DATE).days)
+                if day_slice is not None:
+                    day_columns = {name: newly_fetched_data[name][day_slice] for name in OHLCV_COLUMNS}
+                else:
+                    # Cache the empty day too, so holidays/weekends aren't refetched.
+                    day_columns = _empty_ohlcv_columns()
+                day_cache_entries.append((cache_key_by_day[day], day_columns))
 
-        logging.info(f"Fetching missing 1s data from DTN for {len(missing_dates)} dates in range: {fetch_start_time} to {fetch_end_time}")
-        
-        newly_fetched_data = fetch_from_dtn_iq_api(
-            trading_symbol=token,
-            interval_val="1s",
-            start_time=fetch_start_time,
-            end_time=fetch_end_time
-        )
-        
-        if newly_fetched_data:
-            all_1s_candles.extend(newly_fetched_data)
-            new_data_df = pd.DataFrame([c.model_dump() for c in newly_fetched_data])
-            if not new_data_df.empty:
-                new_data_df['timestamp'] = pd.to_datetime(new_data_df['timestamp'])
-                new_data_df['date_key'] = new_data_df['timestamp'].dt.strftime('%Y-%m-%d')
-                grouped_new_data = {date_key: group for date_key, group in new_data_df.groupby('date_key')}
-                
-                logging.info(f"Queueing {len(missing_dates)} daily records into Redis pipeline for caching.")
-                pipe = redis_client.pipeline()
-                for day in missing_dates:
-                    date_str = day.strftime('%Y-%m-%d')
-                    day_cache_key = build_ohlc_cache_key(exchange, token, "1s", date_str, session_token=session_token)
-                    
-                    if date_str in grouped_new_data:
-                        group = grouped_new_data[date_str]
-                        # =================== FIX START ===================
-                        # Convert the DataFrame group to a list of dictionaries first
-                        records_to_cache = group.to_dict(orient='records')
-                        # Now, iterate through the list and convert the Timestamp object to a string
-                        for record in records_to_cache:
-                            record['timestamp'] = record['timestamp'].isoformat()
-                        # Now the list of dictionaries is fully JSON serializable
-                        pipe.set(day_cache_key, json.dumps(records_to_cache), ex=CACHE_EXPIRATION_SECONDS)
-                        # =================== FIX END ===================
-                    else:
-                        pipe.set(day_cache_key, json.dumps([]), ex=CACHE_EXPIRATION_SECONDS)
-                
-                pipe.execute()
-                logging.info("Redis pipeline execution complete.")
+        if day_cache_entries:
+            # Nothing in this request reads the day caches back, so the writes run
+            # after the response has been sent.
+            background_tasks.add_task(_write_day_caches, session_token, day_cache_entries)
+
+    if not column_parts:
+        return _empty_ohlcv_columns()
+
+    ordered_parts = [column_parts[day] for day in sorted(column_parts)]
 
-    all_1s_candles.sort(key=lambda c: c.timestamp)
     start_time_aware = start_time.replace(tzinfo=timezone.utc) if start_time.tzinfo is None else start_time
     end_time_aware = end_time.replace(tzinfo=timezone.utc) if end_time.tzinfo is None else end_time
-    
-    final_filtered_candles = [
-        c for c in all_1s_candles if start_time_aware <= c.timestamp <= end_time_aware
-    ]
 
-    return final_filtered_candles
+    return _merge_and_filter_parts(
+        ordered_parts, pd.Timestamp(start_time_aware).value, pd.Timestamp(end_time_aware).value
+    )
 
-def _process_and_cache_full_data(
-    background_tasks: BackgroundTasks,
-    session_token: str,
-    exchange: str,
-    token: str,
-    interval_val: str,
-    start_time: datetime,
-    end_time: datetime
-) -> Optional[str]:
+def _merge_and_filter_parts(
+    ordered_parts: List[Dict[str, np.ndarray]], start_ns: int, end_ns: int
+) -> Dict[str, np.ndarray]:
     """
-    Fetches, processes, and caches the ENTIRE dataset for a given range.
-    Returns the cache key (request_id) where the full data is stored.
+    Concatenates date-ordered column parts and keeps rows with start_ns <= ts <= end_ns.
+
+    Each part is sorted (IQFeed returns bars ascending, cached days are stored in
+    order) and parts cover disjoint, increasing days, so the result is sorted
+    without any merge or sort: each part is trimmed to the range with two binary
+    searches and only the in-range rows are copied, straight into the final
+    arrays. If the parts ever overlap or are unsorted, the whole set is
+    concatenated and stable-argsorted before filtering instead.
     """
-    base_1s_candles = _get_and_prepare_1s_data_for_range(
-        background_tasks, session_token, exchange, token, start_time, end_time
+    ordered_parts = [part for part in ordered_parts if part["timestamp"].size]
+    if not ordered_parts:
+        return _empty_ohlcv_columns()
+    part_timestamps = [part["timestamp"] for part in ordered_parts]
+    already_sorted = all(
+        bool(np.all(ts[1:] >= ts[:-1])) for ts in part_timestamps
+    ) and all(
+        prev[-1] <= nxt[0] for prev, nxt in zip(part_timestamps, part_timestamps[1:])
     )
 
-    if not base_1s_candles:
-        logging.warning(f"No 1s base data found for {exchange}:{token} in range to process.")
-        return None
+    if already_sorted:
+        bounds = [
+            (np.searchsorted(ts, start_ns, side="left"), np.searchsorted(ts, end_ns, side="right"))
+            for ts in part_timestamps
+        ]
+        return {
+            name: np.concatenate([part[name][lo:hi] for part, (lo, hi) in zip(ordered_parts, bounds)])
+            for name in OHLCV_COLUMNS
+        }
+
+    all_1s = {name: np.concatenate([part[name] for part in ordered_parts]) for name in OHLCV_COLUMNS}
+    order = np.argsort(all_1s["timestamp"], kind="stable")
+    all_1s = {name: column[order] for name, column in all_1s.items()}
+    timestamps = all_1s["timestamp"]
+    lo = np.searchsorted(timestamps, start_ns, side="left")
+    hi = np.searchsorted(timestamps, end_ns, side="right")
+    return {name: column[lo:hi] for name, column in all_1s.items()}
+
+def _cache_full_range(
+    session_token: str,
+    request_range_id: str,
+    interval_val: str,
+    base_1s: Dict[str, np.ndarray],
+    full_data: Dict[str, np.ndarray]
+) -> None:
+    """
+    Caches the full-range 1s columns (and the requested interval, if not 1s) in
+    one pipeline. Runs before the first page is returned, since that response
+    hands out the requested interval's key as the request_id for /chunk.
+    """
+    # Always cache the full 1s data for the range, so subsequent 1s requests are fast.
+    full_1s_cache_key = f"{request_range_id}:1s"
+    payloads_to_cache = {full_1s_cache_key: (pack_ohlc_columns(base_1s), interval_cache_ttl("1s"))}
+    if interval_val != "1s":
+        payloads_to_cache[f"{request_range_id}:{interval_val}"] = (
+            pack_ohlc_columns(full_data), interval_cache_ttl(interval_val)
+        )
+    set_many_cached_ohlc_data_raw(payloads_to_cache, session_token=session_token)
+    logging.info(f"Full-range data cached for {request_range_id} (1s and '{interval_val}').")
 
-    final_candles: List[schemas.Candle]
-    if interval_val == "1s":
-        final_candles = [schemas.Candle(**c.model_dump()) for c in base_1s_candles]
-    else:
-        aggregation_seconds = INTERVAL_SECONDS_MAP.get(interval_val)
-        if not aggregation_seconds:
-            raise HTTPException(status_code=400, detail=f"Unsupported interval for resampling: {interval_val}")
-
-        # Prepare numpy arrays for Numba kernel
-        timestamps_1s_np = np.array([c.timestamp.replace(tzinfo=timezone.utc).timestamp() for c in base_1s_candles], dtype=np.float64)
-        open_1s_np = np.array([c.open for c in base_1s_candles], dtype=np.float64)
-        high_1s_np = np.array([c.high for c in base_1s_candles], dtype=np.float64)
-        low_1s_np = np.array([c.low for c in base_1s_candles], dtype=np.float64)
-        close_1s_np = np.array([c.close for c in base_1s_candles], dtype=np.float64)
-        volume_1s_np = np.array([c.volume if c.volume is not None else 0.0 for c in base_1s_candles], dtype=np.float64)
-        
-        # Launch resampling
-        (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg, num_agg_bars) = launch_resample_ohlc(
-            timestamps_1s_np, open_1s_np, high_1s_np, low_1s_np, close_1s_np, volume_1s_np,
-            aggregation_seconds
+def _schedule_resampling(session_token: str, request_range_id: str, interval_val: str) -> None:
+    """
+    Triggers the background pre-aggregation of every other interval once per
+    range. Runs as a BackgroundTask after the first page has been sent.
+    """
+    full_1s_cache_key = f"{request_range_id}:1s"
+    # SET NX both checks and sets the flag, so the task is triggered only once per range.
+    # The flag is session-scoped like the data, so it is registered for cleanup too.
+    task_triggered_key = f"{request_range_id}:task_triggered"
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(task_triggered_key, "true", ex=3600, nx=True)
+    register_session_data_keys(pipe, session_token, [task_triggered_key])
+    task_triggered_now = pipe.execute()[0]
+    if task_triggered_now:
+        # The task reads the packed 1s columns cached by _cache_full_range, so no separate
+        # hand-off copy is written.
+        logging.info(f"Adding Celery task to pre-aggregate all other intervals for range: {request_range_id}")
+        resample_and_cache_all_intervals_task.delay(
+            base_1s_data_key=full_1s_cache_key,
+            request_id_prefix=request_range_id,
+            user_requested_interval=interval_val,
+            session_token=session_token
         )
+    else:
+        logging.info(f"Background pre-aggregation task for range {request_range_id} was already triggered. Skipping.")
 
-        resampled_candles: List[schemas.Candle] = []
-        for i in range(num_agg_bars):
-            agg_dt = datetime.fromtimestamp(ts_agg[i], tz=timezone.utc)
-            resampled_candles.append(schemas.Candle(
-                timestamp=agg_dt,
-                open=o_agg[i], high=h_agg[i], low=l_agg[i], close=c_agg[i], volume=v_agg[i]
-            ))
-        final_candles = resampled_candles
-
-    if final_candles:
-        request_id = f"chart_data:{session_token}:{uuid.uuid4()}"
-        set_cached_ohlc_data(request_id, final_candles, expiration=3600)  # Cache for 1 hour
-        logging.info(f"Full dataset with {len(final_candles)} candles processed and cached with request_id: {request_id}")
-        return request_id
-    
-    return None
+def _candles_from_columns_slice(columns: Dict[str, np.ndarray], start: int, stop: int) -> List[schemas.Candle]:
+    """Builds Candle models for rows [start:stop) of packed OHLCV columns only."""
+    return columns_to_candles(*(columns[name][start:stop] for name in OHLCV_COLUMNS))
+
+def _columnar_from_columns_slice(columns: Dict[str, np.ndarray], start: int, stop: int) -> Dict[str, np.ndarray]:
+    """
+    Rows [start:stop) of packed OHLCV columns as flat {t, o, h, l, c, v} arrays
+    (t = unix seconds), taken straight from the columns with no Candle models.
+    Serialized with orjson's numpy support this avoids encoding one dict per candle.
+    """
+    return {
+        "t": columns["timestamp"][start:stop] / 1e9,
+        "o": columns["open"][start:stop],
+        "h": columns["high"][start:stop],
+        "l": columns["low"][start:stop],
+        "c": columns["close"][start:stop],
+        "v": columns["volume"][start:stop],
+    }
+
+def _empty_candles(columnar: bool) -> Union[List[schemas.Candle], Dict[str, np.ndarray]]:
+    return _columnar_from_columns_slice(_empty_ohlcv_columns(), 0, 0) if columnar else []
 
 def get_initial_historical_data(
     background_tasks: BackgroundTasks,
@@ -365,8 +428,13 @@ def get_initial_historical_data(
     interval_val: str,
     start_time: datetime,
     end_time: datetime,
-    limit: int = 5000
-) -> schemas.HistoricalDataResponse:
+    limit: int = 5000,
+    columnar: bool = False
+) -> Union[schemas.HistoricalDataResponse, Dict[str, Any]]:
+    """
+    With `columnar=True` the response is returned as a plain dict whose
+    "candles" are {t, o, h, l, c, v} arrays, ready for ORJSONResponse.
+    """
     
     # Define a unique prefix for this query range, independent of interval
     request_range_id = f"chart_data_full:{session_token}:{exchange}:{token}:{start_time.isoformat()}:{end_time.isoformat()}"
@@ -374,120 +442,103 @@ def get_initial_historical_data(
     # Define the specific cache key for the requested interval
     target_data_key = f"{request_range_id}:{interval_val}"
 
-    # 1. Check if pre-aggregated data for this specific interval already exists
-    full_data = get_cached_ohlc_data(target_data_key)
+    # 1. Check if pre-aggregated data for this specific interval already exists.
+    # Interval results are cached as packed columns; Candle models are only built
+    # for the slice actually returned.
+    full_data = get_cached_ohlc_columns(target_data_key)
     
     request_id_for_chunks = target_data_key
 
-    if not full_data:
+    if full_data is None:
         # 2. Cache MISS for the target interval. Process from base 1s data.
         logging.info(f"Cache MISS for {target_data_key}. Processing from base 1s data.")
         
-        base_1s_candles = _get_and_prepare_1s_data_for_range(
+        base_1s = _get_and_prepare_1s_data_for_range(
             background_tasks, session_token, exchange, token, start_time, end_time
         )
 
-        if not base_1s_candles:
-            return schemas.HistoricalDataResponse(candles=[], total_available=0, is_partial=False, message="No data available for the selected range.", request_id=None, offset=None)
-
-        # Convert to full `Candle` schema for caching and processing
-        full_1s_data = [schemas.Candle(**c.model_dump()) for c in base_1s_candles]
-
-        # FIX: Always cache the full 1s data for the range, so subsequent 1s requests are fast.
-        full_1s_cache_key = f"{request_range_id}:1s"
-        set_cached_ohlc_data(full_1s_cache_key, full_1s_data, expiration=3600)
-        logging.info(f"Base '1s' data cached for the full range under key: {full_1s_cache_key}")
+        if not base_1s["timestamp"].size:
+            return _historical_data_response(columnar, candles=_empty_candles(columnar), total_available=0, is_partial=False, message="No data available for the selected range.", request_id=None, offset=None)
 
         # Now, determine the data to return to the user
         if interval_val == "1s":
-            full_data = full_1s_data
+            full_data = base_1s
         else:
             # Resample the 1s data if a different interval was requested
             aggregation_seconds = INTERVAL_SECONDS_MAP.get(interval_val)
             if not aggregation_seconds:
                 raise HTTPException(status_code=400, detail=f"Unsupported interval for resampling: {interval_val}")
 
-            timestamps_1s_np = np.array([c.timestamp.replace(tzinfo=timezone.utc).timestamp() for c in full_1s_data], dtype=np.float64)
-            open_1s_np = np.array([c.open for c in full_1s_data], dtype=np.float64)
-            high_1s_np = np.array([c.high for c in full_1s_data], dtype=np.float64)
-            low_1s_np = np.array([c.low for c in full_1s_data], dtype=np.float64)
-            close_1s_np = np.array([c.close for c in full_1s_data], dtype=np.float64)
-            volume_1s_np = np.array([c.volume if c.volume is not None else 0.0 for c in full_1s_data], dtype=np.float64)
-            
             (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg, num_agg_bars) = launch_resample_ohlc(
-                timestamps_1s_np, open_1s_np, high_1s_np, low_1s_np, close_1s_np, volume_1s_np,
-                aggregation_seconds
+                *(base_1s[name] for name in OHLCV_COLUMNS), aggregation_seconds
             )
+            full_data = dict(zip(OHLCV_COLUMNS, (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg)))
 
-            resampled_candles = []
-            for i in range(num_agg_bars):
-                agg_dt = datetime.fromtimestamp(ts_agg[i], tz=timezone.utc)
-                resampled_candles.append(schemas.Candle(
-                    timestamp=agg_dt, open=o_agg[i], high=h_agg[i], low=l_agg[i], close=c_agg[i], volume=v_agg[i]
-                ))
-            full_data = resampled_candles
-
-        if not full_data:
-             return schemas.HistoricalDataResponse(candles=[], total_available=0, is_partial=False, message="Data processing yielded no results.", request_id=None, offset=None)
-
-        # Cache the data for the interval the user actually requested (if it wasn't 1s)
-        if interval_val != "1s":
-            set_cached_ohlc_data(target_data_key, full_data, expiration=3600)
-            logging.info(f"On-demand data for interval '{interval_val}' cached under key: {target_data_key}")
-        
-        # 3. FIX: Trigger the background task only once using a Redis flag
-        task_triggered_key = f"{request_range_id}:task_triggered"
-        if redis_client.get(task_triggered_key) is None:
-            base_1s_data_key_for_task = f"temp_1s_data:{uuid.uuid4()}"
-            set_cached_ohlc_data(base_1s_data_key_for_task, base_1s_candles, expiration=600)
-
-            logging.info(f"Adding Celery task to pre-aggregate all other intervals for range: {request_range_id}")
-            resample_and_cache_all_intervals_task.delay(
-                base_1s_data_key=base_1s_data_key_for_task,
-                request_id_prefix=request_range_id,
-                user_requested_interval=interval_val
-            )
-            # Set the flag to prevent re-triggering for this range.
-            redis_client.set(task_triggered_key, "true", ex=3600)
-        else:
-            logging.info(f"Background pre-aggregation task for range {request_range_id} was already triggered. Skipping.")
+        if not full_data["timestamp"].size:
+             return _historical_data_response(columnar, candles=_empty_candles(columnar), total_available=0, is_partial=False, message="Data processing yielded no results.", request_id=None, offset=None)
+
+        # 3. Cache the full range now, since the response advertises its key for
+        # /chunk; only the pre-aggregation trigger waits until after the response.
+        # The first page below is still built from the in-memory columns.
+        _cache_full_range(session_token, request_range_id, interval_val, base_1s, full_data)
+        background_tasks.add_task(_schedule_resampling, session_token, request_range_id, interval_val)
 
     # 4. Prepare and return the response chunk
-    total_available = len(full_data)
+    total_available = full_data["timestamp"].size
     initial_offset = max(0, total_available - limit)
-    candles_to_send = full_data[initial_offset:] 
+    num_to_send = total_available - initial_offset
+    if columnar:
+        candles_to_send = _columnar_from_columns_slice(full_data, initial_offset, total_available)
+    else:
+        candles_to_send = _candles_from_columns_slice(full_data, initial_offset, total_available)
     
-    return schemas.HistoricalDataResponse(
+    return _historical_data_response(
+        columnar,
         request_id=request_id_for_chunks,
         candles=candles_to_send,
         offset=initial_offset,
         total_available=total_available,
-        is_partial=total_available > len(candles_to_send),
-        message=f"Initial data loaded. Displaying last {len(candles_to_send)} of {total_available} candles."
+        is_partial=total_available > num_to_send,
+        message=f"Initial data loaded. Displaying last {num_to_send} of {total_available} candles."
     )
 
+def _historical_data_response(columnar: bool, **fields) -> Union[schemas.HistoricalDataResponse, Dict[str, Any]]:
+    # Columnar payloads skip the Pydantic model: they are already plain arrays.
+    return fields if columnar else schemas.HistoricalDataResponse(**fields)
+
+def _historical_data_chunk_response(columnar: bool, **fields) -> Union[schemas.HistoricalDataChunkResponse, Dict[str, Any]]:
+    return fields if columnar else schemas.HistoricalDataChunkResponse(**fields)
+
 def get_historical_data_chunk(
     request_id: str,
     offset: int,
-    limit: int = 5000
-) -> schemas.HistoricalDataChunkResponse:
+    limit: int = 5000,
+    columnar: bool = False
+) -> Union[schemas.HistoricalDataChunkResponse, Dict[str, Any]]:
+    """Same `columnar` contract as get_initial_historical_data."""
     
     if not request_id.startswith("chart_data_full:"):
         raise HTTPException(status_code=400, detail="Invalid request_id format.")
 
-    full_data = get_cached_ohlc_data(request_id)
+    # Only the requested page is read from Redis (GETRANGE per column).
+    cached_slice = get_cached_ohlc_columns_slice(request_id, offset, offset + limit)
 
-    if full_data is None:
+    if cached_slice is None:
         raise HTTPException(status_code=404, detail="Data for this request not found or has expired.")
 
-    total_available = len(full_data)
+    total_available, page_columns = cached_slice
     
     if offset >= total_available:
-        return schemas.HistoricalDataChunkResponse(candles=[], offset=offset, limit=limit, total_available=total_available)
+        return _historical_data_chunk_response(columnar, candles=_empty_candles(columnar), offset=offset, limit=limit, total_available=total_available)
         
-    chunk = full_data[offset : offset + limit]
+    page_size = page_columns["timestamp"].size
+    if columnar:
+        chunk = _columnar_from_columns_slice(page_columns, 0, page_size)
+    else:
+        chunk = _candles_from_columns_slice(page_columns, 0, page_size)
     
-    return schemas.HistoricalDataChunkResponse(
+    return _historical_data_chunk_response(
+        columnar,
         candles=chunk,
         offset=offset,
         limit=limit,
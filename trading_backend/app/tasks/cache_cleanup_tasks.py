@@ -1,53 +1,61 @@
 # app/tasks/cache_cleanup_tasks.py
 from .celery_app import celery_application
-from app.core.cache import redis_client
-import time
+from app.core.cache import redis_client, ACTIVE_SESSIONS_KEY, session_data_keys_key
 import logging
 
-SESSION_TIMEOUT_SECONDS = 30 * 60  # 30 minutes
+# Session keys are checked with one MGET per batch of this many tokens.
+SESSION_CHECK_BATCH_SIZE = 500
 
 @celery_application.task(name="tasks.cleanup_expired_sessions")
 def cleanup_expired_sessions_task():
     """
-    Scans for all session keys, checks if they have expired, and if so,
-    deletes the session key and all associated user data from the cache.
+    Walks the registry of active sessions and, for every session whose key
+    Redis has already expired (session keys carry the timeout as their TTL),
+    deletes the associated user data early and drops it from the registry.
     """
     logging.info("Starting expired session cleanup task...")
     try:
-        session_keys = [key.decode('utf-8') for key in redis_client.scan_iter("session:*")]
-        current_time = int(time.time())
+        # Registry sets instead of SCANs: cost is proportional to the number of
+        # sessions, not to the size of the keyspace.
+        session_tokens = [token.decode('utf-8') for token in redis_client.smembers(ACTIVE_SESSIONS_KEY)]
         expired_sessions_count = 0
         deleted_data_keys_count = 0
+        # All deletions are queued here and sent in one round-trip at the end.
+        # UNLINK frees values on a background thread, so large cached payloads
+        # don't stall the Redis main thread like DEL would.
+        unlink_pipe = redis_client.pipeline()
 
-        for session_key in session_keys:
-            last_seen_timestamp_bytes = redis_client.get(session_key)
-            if last_seen_timestamp_bytes:
-                last_seen_timestamp = int(last_seen_timestamp_bytes)
-                if current_time - last_seen_timestamp > SESSION_TIMEOUT_SECONDS:
-                    # Session has expired
-                    expired_sessions_count += 1
-                    session_token = session_key.split(":")[1]
-                    logging.info(f"Session {session_token[:8]}... expired. Deleting associated data.")
-
-                    # Delete the session key itself
-                    redis_client.delete(session_key)
-
-                    # Find and delete associated user data keys
-                    user_data_pattern = f"user:{session_token}:*"
-                    # Use a pipeline for bulk deletion for efficiency
-                    pipe = redis_client.pipeline()
-                    keys_to_delete = [key for key in redis_client.scan_iter(user_data_pattern)]
-                    if keys_to_delete:
-                        for key in keys_to_delete:
-                            pipe.delete(key)
-                        pipe.execute()
-                        deleted_data_keys_count += len(keys_to_delete)
-                        logging.debug(f"Deleted {len(keys_to_delete)} data keys for expired session.")
-
-        logging.info(f"Cleanup task finished. Found {len(session_keys)} total sessions. "
+        for batch_start in range(0, len(session_tokens), SESSION_CHECK_BATCH_SIZE):
+            batch_tokens = session_tokens[batch_start:batch_start + SESSION_CHECK_BATCH_SIZE]
+            session_values = redis_client.mget([f"session:{token}" for token in batch_tokens])
+
+            # Expiry itself is decided by Redis: a session whose key is gone has timed out.
+            expired_tokens = [token for token, value in zip(batch_tokens, session_values) if value is None]
+            if not expired_tokens:
+                continue
+
+            pipe = redis_client.pipeline()
+            for session_token in expired_tokens:
+                pipe.smembers(session_data_keys_key(session_token))
+            data_key_sets = pipe.execute()
+
+            for session_token, data_keys in zip(expired_tokens, data_key_sets):
+                logging.info(f"Session {session_token[:8]}... expired. Deleting associated data.")
+                if data_keys:
+                    unlink_pipe.unlink(*data_keys)
+                    deleted_data_keys_count += len(data_keys)
+                    logging.debug(f"Deleting {len(data_keys)} data keys for expired session.")
+                unlink_pipe.unlink(session_data_keys_key(session_token))
+            unlink_pipe.srem(ACTIVE_SESSIONS_KEY, *expired_tokens)
+            expired_sessions_count += len(expired_tokens)
+
+        if expired_sessions_count:
+            unlink_pipe.execute()
+
+        logging.info(f"Cleanup task finished. Found {len(session_tokens)} total sessions. "
                      f"Cleaned up {expired_sessions_count} expired sessions and deleted {deleted_data_keys_count} associated data keys.")
         return {"status": "success", "sessions_cleaned": expired_sessions_count, "data_keys_deleted": deleted_data_keys_count}
 
     except Exception as e:
         logging.error(f"Error during cache cleanup task: {e}", exc_info=True)
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
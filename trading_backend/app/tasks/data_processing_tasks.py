@@ -1,13 +1,15 @@
 # trading_backend/app/tasks/data_processing_tasks.py
 
+from celery.signals import worker_init
 from .celery_app import celery_application
-from app.core.cache import get_cached_ohlc_data, set_cached_ohlc_data
-from app.core.numba_resampling_kernels import launch_resample_ohlc
-from app import schemas
-import numpy as np
-import json
-from datetime import datetime, timezone
+from app.core.cache import (
+    redis_client, get_cached_ohlc_columns, set_many_cached_ohlc_data_raw, pack_ohlc_columns,
+    interval_cache_ttl, OHLCV_COLUMNS,
+)
+from app.core.numba_resampling_kernels import launch_resample_ohlc_multi, warm_up_resampling_kernels, NANOS_PER_SECOND
 import logging
+from typing import Optional
+from redis.exceptions import LockError
 
 INTERVAL_SECONDS_MAP = {
     "1s": 1, "5s": 5, "10s": 10, "15s": 15, "30s": 30, "45s": 45,
@@ -15,55 +17,95 @@ INTERVAL_SECONDS_MAP = {
     "30m": 1800, "45m": 2700, "1h": 3600, "1d": 86400
 }
 
+@worker_init.connect
+def _warm_up_resampling(**kwargs):
+    # worker_init runs once in the worker's main process (also with the eventlet
+    # pool), so the first resampling task doesn't pay the JIT cost.
+    warm_up_resampling_kernels()
+
+# Upper bound on one resampling run; the lock expires after this even if a
+# worker dies mid-task.
+RESAMPLE_LOCK_TIMEOUT_SECONDS = 300
+
 @celery_application.task(name="tasks.resample_and_cache_all_intervals")
 def resample_and_cache_all_intervals_task(
     base_1s_data_key: str,
     request_id_prefix: str, # e.g., "chart_data_full:SESSION_TOKEN:EXCHANGE:TOKEN:START:END"
-    user_requested_interval: str
+    user_requested_interval: str,
+    session_token: Optional[str] = None
 ):
     """
-    Given a cache key for full-range 1s data, this task resamples it to all
-    other standard intervals and caches each result under a specific key.
+    Given a cache key for full-range 1s data (packed OHLCV columns), this task
+    resamples it to all other standard intervals and caches each result under a
+    specific key. Only one run per range executes at a time; a concurrent
+    duplicate returns immediately. The keys are registered under
+    `session_token` so session cleanup removes them.
     """
-    logging.info(f"Starting background resampling for prefix {request_id_prefix}")
+    lock = redis_client.lock(f"lock:resample:{request_id_prefix}", timeout=RESAMPLE_LOCK_TIMEOUT_SECONDS)
+    if not lock.acquire(blocking=False):
+        logging.info("Resampling for prefix %s is already running. Skipping.", request_id_prefix)
+        return
+    try:
+        _resample_and_cache_all_intervals(base_1s_data_key, request_id_prefix, user_requested_interval, session_token)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # Expired (run outlived the timeout) or already taken over; nothing to release.
+            pass
+
+def _resample_and_cache_all_intervals(
+    base_1s_data_key: str,
+    request_id_prefix: str,
+    user_requested_interval: str,
+    session_token: Optional[str] = None
+) -> None:
+    logging.info("Starting background resampling for prefix %s", request_id_prefix)
     
-    base_1s_candles = get_cached_ohlc_data(base_1s_data_key)
-    if not base_1s_candles:
-        logging.warning(f"No 1s base data at key {base_1s_data_key} to perform background resampling.")
+    base_1s = get_cached_ohlc_columns(base_1s_data_key)
+    if base_1s is None or not base_1s["timestamp"].size:
+        logging.warning("No 1s base data at key %s to perform background resampling.", base_1s_data_key)
         return
         
-    # Prepare numpy arrays from the 1s data
-    timestamps_1s_np = np.array([c.timestamp.replace(tzinfo=timezone.utc).timestamp() for c in base_1s_candles], dtype=np.float64)
-    open_1s_np = np.array([c.open for c in base_1s_candles], dtype=np.float64)
-    high_1s_np = np.array([c.high for c in base_1s_candles], dtype=np.float64)
-    low_1s_np = np.array([c.low for c in base_1s_candles], dtype=np.float64)
-    close_1s_np = np.array([c.close for c in base_1s_candles], dtype=np.float64)
-    volume_1s_np = np.array([c.volume if c.volume is not None else 0.0 for c in base_1s_candles], dtype=np.float64)
+    # Skip intervals that are already cached (idempotent retries, overlapping
+    # requests) and those the range can't fill with more than one bar; both are
+    # cheap to serve on demand. EXISTS for every key goes in one round-trip.
+    candidate_intervals = [
+        interval for interval in INTERVAL_SECONDS_MAP
+        if interval not in ("1s", user_requested_interval)
+    ]
+    pipe = redis_client.pipeline(transaction=False)
+    for interval in candidate_intervals:
+        pipe.exists(f"{request_id_prefix}:{interval}")
+    already_cached = pipe.execute()
 
+    first_ts, last_ts = int(base_1s["timestamp"][0]), int(base_1s["timestamp"][-1])
+    target_intervals = {}
+    for interval, is_cached in zip(candidate_intervals, already_cached):
+        bucket_ns = INTERVAL_SECONDS_MAP[interval] * NANOS_PER_SECOND
+        if not is_cached and last_ts // bucket_ns > first_ts // bucket_ns:
+            target_intervals[interval] = INTERVAL_SECONDS_MAP[interval]
+    if not target_intervals:
+        logging.info("Nothing left to resample for %s", request_id_prefix)
+        return
 
-    for interval, agg_seconds in INTERVAL_SECONDS_MAP.items():
-        if interval == user_requested_interval or interval == "1s":
-            continue # Skip the one the user already got and the base data
+    # Every interval is resampled in one call: coarser intervals are built from
+    # finer results instead of rescanning the 1s columns each time.
+    resampled_by_seconds = launch_resample_ohlc_multi(
+        *(base_1s[name] for name in OHLCV_COLUMNS), target_intervals.values()
+    )
 
-        logging.debug(f"Background resampling to {interval} for {request_id_prefix}")
-        
-        # Resample
-        (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg, num_agg_bars) = launch_resample_ohlc(
-            timestamps_1s_np, open_1s_np, high_1s_np, low_1s_np, close_1s_np, volume_1s_np,
-            agg_seconds
-        )
+    # Written together at the end: one pipelined round-trip instead of one per interval.
+    payloads_to_cache = {}
+    for interval, agg_seconds in target_intervals.items():
+        (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg, num_agg_bars) = resampled_by_seconds[agg_seconds]
         
         if num_agg_bars > 0:
-            resampled_candles = []
-            for i in range(num_agg_bars):
-                agg_dt = datetime.fromtimestamp(ts_agg[i], tz=timezone.utc)
-                resampled_candles.append(schemas.Candle(
-                    timestamp=agg_dt,
-                    open=o_agg[i], high=h_agg[i], low=l_agg[i], close=c_agg[i], volume=v_agg[i]
-                ))
-            
-            # Cache the result
+            # Cache the packed columns; readers build Candles only for the slice they return
+            resampled_columns = dict(zip(OHLCV_COLUMNS, (ts_agg, o_agg, h_agg, l_agg, c_agg, v_agg)))
             target_cache_key = f"{request_id_prefix}:{interval}"
-            set_cached_ohlc_data(target_cache_key, resampled_candles, expiration=3600) # Cache for 1 hour
+            payloads_to_cache[target_cache_key] = (pack_ohlc_columns(resampled_columns), interval_cache_ttl(interval))
+
+    set_many_cached_ohlc_data_raw(payloads_to_cache, session_token=session_token)
     
-    logging.info(f"Finished background resampling for {request_id_prefix}")
\ No newline at end of file
+    logging.info("Finished background resampling for %s", request_id_prefix)
\ No newline at end of file
@@ -8,7 +8,9 @@ This is an example that launches IQConnect.exe.
 
 import os
 import time
+import signal
 import argparse
+import threading
 import app.pyiqfeed as iq
 import socket # Added for specific socket error handling
 import logging # Added for better logging
@@ -22,6 +24,39 @@ dtn_product_id: Optional[str] = os.getenv("DTN_PRODUCT_ID")
 dtn_login: Optional[str] = os.getenv("DTN_LOGIN")
 dtn_password: Optional[str] = os.getenv("DTN_PASSWORD")
 
+# A launch() that succeeded this recently is trusted instead of re-probing
+# IQConnect before the next connection attempt.
+LAUNCH_RECHECK_SECONDS = 300
+
+# How often waits re-check the control file. A SIGINT/SIGTERM wakes them at once.
+CTRL_FILE_POLL_SECONDS = 1.0
+
+# Set by the signal handler or once the control file shows up.
+stop_requested = threading.Event()
+
+def _request_stop(signum, frame) -> None:
+    logging.info("Received signal %s. Initiating shutdown.", signum)
+    stop_requested.set()
+
+def should_stop(ctrl_file: str) -> bool:
+    if not stop_requested.is_set() and os.path.isfile(ctrl_file):
+        logging.info("Control file '%s' found. Initiating shutdown.", ctrl_file)
+        stop_requested.set()
+    return stop_requested.is_set()
+
+def wait_for_stop(ctrl_file: str, timeout: float) -> bool:
+    """
+    Blocks for up to `timeout` seconds, returning early (True) when a stop is
+    requested. Signals end the wait immediately instead of after a sleep().
+    """
+    deadline = time.monotonic() + timeout
+    while not should_stop(ctrl_file):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        stop_requested.wait(min(CTRL_FILE_POLL_SECONDS, remaining))
+    return True
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Launch IQFeed.")
     parser.add_argument('--nohup', action='store_true',
@@ -39,6 +74,9 @@ if __name__ == "__main__":
     headless = arguments.headless
     ctrl_file = arguments.ctrl_file
 
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
     # Initialize IQ_FEED object once
     # This ensures IQ_FEED is defined for use inside the loop
     IQ_FEED: Optional[iq.FeedService] = None
@@ -49,51 +87,56 @@ if __name__ == "__main__":
                                  login=dtn_login,
                                  password=dtn_password)
     except Exception as e_init:
-        logging.error(f"Failed to initialize IQFeed Service object: {e_init}", exc_info=True)
+        logging.error("Failed to initialize IQFeed Service object: %s", e_init, exc_info=True)
         logging.error("Script will exit as it cannot interface with IQFeed.")
         exit(1)
 
     # Initial launch attempt
     try:
-        logging.info(f"Initial launch attempt for IQFeed (headless={headless}, nohup={nohup}). This may take a moment...")
+        logging.info("Initial launch attempt for IQFeed (headless=%s, nohup=%s). This may take a moment...", headless, nohup)
         IQ_FEED.launch(timeout=60,
                        check_conn=True,
                        headless=headless,
                        nohup=nohup)
         logging.info("Initial IQFeed.launch command issued. IQConnect should be running.")
+        last_launch_ok: Optional[float] = time.monotonic()
     except RuntimeError as e:
-        logging.error(f"Failed to launch or connect to IQFeed during initial setup: {e}")
+        logging.error("Failed to launch or connect to IQFeed during initial setup: %s", e)
         logging.error("Please ensure IQConnect.exe can be started and login credentials are correct.")
         logging.error("The script will exit as it cannot ensure IQFeed is running for the first time.")
         exit(1)
     except Exception as e:
-        logging.error(f"An unexpected error occurred during initial IQFeed launch: {e}", exc_info=True)
+        logging.error("An unexpected error occurred during initial IQFeed launch: %s", e, exc_info=True)
         exit(1)
 
 
     # Main loop for maintaining connection and checking control file
-    while not os.path.isfile(ctrl_file):
+    while not should_stop(ctrl_file):
         admin_conn = None # Ensure admin_conn is defined for potential cleanup outside try
         try:
-            # **** ADDED: Ensure IQConnect.exe is running before each connection attempt ****
+            # Ensure IQConnect.exe is running before connecting, unless a launch just
+            # succeeded (e.g. the initial one) and no connection has failed since.
             try:
-                if IQ_FEED: # Check if IQ_FEED was successfully initialized
+                if IQ_FEED and last_launch_ok is not None and time.monotonic() - last_launch_ok <= LAUNCH_RECHECK_SECONDS:
+                    logging.info("IQFeed was launched recently; skipping the pre-connection launch check.")
+                elif IQ_FEED: # Check if IQ_FEED was successfully initialized
                     logging.info("Ensuring IQFeed is running before attempting Admin connection...")
                     IQ_FEED.launch(timeout=30, # Shorter timeout for re-checks
                                    check_conn=True, # Still check connection after launch
                                    headless=headless,
                                    nohup=nohup)
                     logging.info("IQFeed check/re-launch command issued.")
+                    last_launch_ok = time.monotonic()
                 else:
                     logging.error("IQ_FEED service object not initialized. Cannot ensure IQFeed is running.")
                     # This state should ideally not be reached if initial IQ_FEED init fails and exits.
                     raise RuntimeError("IQFeed Service object not available for launch check.")
 
             except RuntimeError as e_launch_retry:
-                logging.error(f"Failed to ensure IQFeed is running during retry: {e_launch_retry}. Will proceed to connection attempt anyway but might fail.")
+                logging.error("Failed to ensure IQFeed is running during retry: %s. Will proceed to connection attempt anyway but might fail.", e_launch_retry)
                 # Don't exit here, let the connection attempt below fail and trigger the normal retry cycle
             except Exception as e_launch_unexpected:
-                logging.error(f"Unexpected error during IQFeed pre-connection launch/check: {e_launch_unexpected}", exc_info=True)
+                logging.error("Unexpected error during IQFeed pre-connection launch/check: %s", e_launch_unexpected, exc_info=True)
                 # As above, let the normal retry cycle handle it.
 
             logging.info("Attempting to establish Admin connection to IQFeed...")
@@ -106,9 +149,9 @@ if __name__ == "__main__":
                 logging.info("Admin connection established. Requesting client stats.")
                 admin_conn.client_stats_on() # Request client stats (optional)
 
-                logging.info(f"Monitoring for control file: {ctrl_file}. Checking every 10 seconds.")
-                # Inner loop: keep checking for the control file while connected
-                while not os.path.isfile(ctrl_file):
+                logging.info("Monitoring for control file: %s. Checking connection health every 10 seconds.", ctrl_file)
+                # Inner loop: keep checking connection health until a stop is requested
+                while True:
                     # The pyiqfeed library's reader thread handles incoming messages.
                     # If the connection drops, an error should be raised by the reader thread
                     # and caught by the outer except blocks.
@@ -116,25 +159,24 @@ if __name__ == "__main__":
                     if not admin_conn.reader_running():
                         logging.warning("AdminConn reader thread is not running. Connection might be lost.")
                         raise ConnectionResetError("AdminConn reader thread terminated unexpectedly.")
-                    time.sleep(10) # Check for ctrl_file periodically
-                
-                # If ctrl_file is found, break the outer loop to exit
-                if os.path.isfile(ctrl_file):
-                    logging.info(f"Control file '{ctrl_file}' found. Initiating shutdown.")
-                    break 
+                    if wait_for_stop(ctrl_file, 10):
+                        break
+
+                # Stop requested: break the outer loop to exit
+                break
 
         except ConnectionRefusedError as e:
-            logging.warning(f"Connection refused: {e}. IQFeed may not be running or ready. Retrying in 15s.")
+            logging.warning("Connection refused: %s. IQFeed may not be running or ready. Retrying in 15s.", e)
         except ConnectionResetError as e:
-            logging.warning(f"Connection reset: {e}. Connection to IQFeed lost. Retrying in 15s.")
+            logging.warning("Connection reset: %s. Connection to IQFeed lost. Retrying in 15s.", e)
         except socket.timeout as e:
-            logging.warning(f"Socket timeout: {e}. Possible network issue or IQFeed unresponsive. Retrying in 15s.")
+            logging.warning("Socket timeout: %s. Possible network issue or IQFeed unresponsive. Retrying in 15s.", e)
         except socket.error as e: # Catch other general socket errors
-            logging.warning(f"A socket error occurred: {e}. Retrying in 15s.")
+            logging.warning("A socket error occurred: %s. Retrying in 15s.", e)
         except RuntimeError as e: # Catch other runtime errors that pyiqfeed might raise
-            logging.error(f"A runtime error occurred: {e}. Retrying in 15s.")
+            logging.error("A runtime error occurred: %s. Retrying in 15s.", e)
         except Exception as e: # Catch any other unexpected errors
-            logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+            logging.error("An unexpected error occurred: %s", e, exc_info=True)
             logging.info("Attempting to recover. Retrying in 15s.")
         
         finally:
@@ -143,32 +185,31 @@ if __name__ == "__main__":
                     logging.debug("Ensuring admin_conn is disconnected in finally block.")
                     admin_conn.disconnect()
                 except Exception as e_disc:
-                    logging.error(f"Error during explicit disconnect in finally: {e_disc}", exc_info=True)
+                    logging.error("Error during explicit disconnect in finally: %s", e_disc, exc_info=True)
             elif admin_conn: # If admin_conn exists but reader isn't running (e.g. connect failed before thread start)
                 try:
                     logging.debug("Attempting disconnect on admin_conn even if reader wasn't running.")
                     admin_conn.disconnect() # pyiqfeed's disconnect should be safe to call
                 except Exception as e_disc_alt:
-                    logging.error(f"Error during alternative disconnect in finally: {e_disc_alt}", exc_info=True)
+                    logging.error("Error during alternative disconnect in finally: %s", e_disc_alt, exc_info=True)
 
-        if os.path.isfile(ctrl_file):
+        if should_stop(ctrl_file):
             break # Exit the main while loop
 
+        # Only failures get here, so the next attempt re-launches IQConnect first.
+        last_launch_ok = None
+
         logging.info("Waiting 15 seconds before next connection attempt...")
-        for _ in range(15):
-            if os.path.isfile(ctrl_file):
-                logging.info(f"Control file '{ctrl_file}' detected during wait. Exiting retry loop.")
-                break
-            time.sleep(1)
-        if os.path.isfile(ctrl_file): # Ensure we break outer loop if detected
+        if wait_for_stop(ctrl_file, 15):
+            logging.info("Stop requested during wait. Exiting retry loop.")
             break
 
     # Cleanup: Remove control file if it exists
     if os.path.exists(ctrl_file):
         try:
-            logging.info(f"Removing control file: {ctrl_file}")
+            logging.info("Removing control file: %s", ctrl_file)
             os.remove(ctrl_file)
         except OSError as e:
-            logging.error(f"Error removing control file '{ctrl_file}': {e}")
+            logging.error("Error removing control file '%s': %s", ctrl_file, e)
     
     logging.info("IQFeed Keep Alive script finished.")
\ No newline at end of file
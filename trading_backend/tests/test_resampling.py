@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from app.core import numba_resampling_kernels as resampling
+from app.core.numba_resampling_kernels import NANOS_PER_SECOND, launch_resample_ohlc
+
+# Six 1s rows spanning three 1-minute buckets (0s, 60s, 120s).
+TIMESTAMPS = np.array([0, 1, 2, 60, 61, 125], dtype=np.int64) * NANOS_PER_SECOND
+OPEN = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+HIGH = np.array([10.0, 12.0, 11.0, 14.0, 13.0, 16.0])
+LOW = np.array([0.5, 1.5, 0.2, 3.5, 3.0, 5.5])
+CLOSE = np.array([1.5, 2.5, 2.8, 4.5, 4.2, 6.5])
+VOLUME = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+EXPECTED_1M = (
+    np.array([0, 60, 120], dtype=np.int64) * NANOS_PER_SECOND,
+    np.array([1.0, 4.0, 6.0]),
+    np.array([12.0, 14.0, 16.0]),
+    np.array([0.2, 3.0, 5.5]),
+    np.array([2.8, 4.2, 6.5]),
+    np.array([6.0, 9.0, 6.0]),
+)
+
+
+def _columns():
+    return TIMESTAMPS, OPEN, HIGH, LOW, CLOSE, VOLUME
+
+
+def _assert_bars_equal(result, expected):
+    *columns, bar_count = result
+    assert bar_count == len(expected[0])
+    assert columns[0].dtype == np.int64
+    np.testing.assert_array_equal(columns[0], expected[0])
+    for actual, wanted in zip(columns[1:], expected[1:]):
+        assert actual.dtype == np.float64
+        np.testing.assert_allclose(actual, wanted)
+
+
+@pytest.fixture
+def numba_kernel(monkeypatch):
+    monkeypatch.setattr(resampling, "USE_NUMBA_KERNEL", True)
+    f64_kernel, _ = resampling._load_kernels()
+    if f64_kernel is None:
+        pytest.skip("Neither Numba nor the AOT resample_mod build is available")
+    return f64_kernel
+
+
+def test_numpy_reference_worked_example():
+    result = resampling._resample_numpy(*_columns(), 60 * NANOS_PER_SECOND)
+    _assert_bars_equal(result, EXPECTED_1M)
+
+
+def test_kernel_matches_numpy_reference(numba_kernel):
+    _assert_bars_equal(launch_resample_ohlc(*_columns(), 60), EXPECTED_1M)
+
+    rng = np.random.default_rng(0)
+    seconds = np.sort(rng.choice(np.arange(200_000), 5_000, replace=False))
+    timestamps = (1_700_000_000 + seconds).astype(np.int64) * NANOS_PER_SECOND
+    prices = [rng.random(seconds.size) * 100 for _ in range(5)]
+    for aggregation_seconds in (1, 5, 60, 3600, 86400):
+        expected = resampling._resample_numpy(
+            timestamps, *prices, aggregation_seconds * NANOS_PER_SECOND
+        )
+        _assert_bars_equal(launch_resample_ohlc(timestamps, *prices, aggregation_seconds), expected[:6])
+
+
+def test_prev_close_open_mode(numba_kernel):
+    *columns, bar_count = launch_resample_ohlc(*_columns(), 60, open_mode="prev_close")
+    assert bar_count == 3
+    # The first bar keeps its own open; later bars open at the previous close.
+    np.testing.assert_allclose(columns[1], [1.0, 2.8, 4.2])
+    np.testing.assert_allclose(columns[4], EXPECTED_1M[4])
+
+
+def test_unknown_open_mode_raises():
+    with pytest.raises(ValueError):
+        launch_resample_ohlc(*_columns(), 60, open_mode="last_in_bucket")
+
+
+def test_read_only_input(numba_kernel):
+    # Columns unpacked from the Redis cache are read-only views.
+    read_only = []
+    for column in _columns():
+        column = column.copy()
+        column.setflags(write=False)
+        read_only.append(column)
+    _assert_bars_equal(launch_resample_ohlc(*read_only, 60), EXPECTED_1M)
+
+
+def test_numpy_fallback_when_kernel_disabled(monkeypatch):
+    monkeypatch.setattr(resampling, "USE_NUMBA_KERNEL", False)
+
+    def fail_load():
+        raise AssertionError("the Numba kernel must not be loaded")
+
+    monkeypatch.setattr(resampling, "_load_kernels", fail_load)
+    _assert_bars_equal(launch_resample_ohlc(*_columns(), 60), EXPECTED_1M)
+
+    *_, bar_count = launch_resample_ohlc(*(column[:0] for column in _columns()), 60)
+    assert bar_count == 0
+
+
+@pytest.mark.parametrize("use_numba_kernel", [True, False])
+def test_unsorted_timestamps_raise(monkeypatch, use_numba_kernel):
+    monkeypatch.setattr(resampling, "USE_NUMBA_KERNEL", use_numba_kernel)
+    timestamps = np.array([0, 120, 5], dtype=np.int64) * NANOS_PER_SECOND
+    prices = np.ones(3)
+    with pytest.raises(ValueError):
+        launch_resample_ohlc(timestamps, prices, prices, prices, prices, prices, 60)
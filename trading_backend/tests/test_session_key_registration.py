@@ -0,0 +1,121 @@
+"""
+Session data is only cleaned up through the `session_keys:{token}` registry
+sets, so every write of a session-scoped key must register that key, and the
+registry must outlive it.
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core import cache
+from app.core.cache import OHLCV_COLUMNS, session_data_keys_key
+from app.core.numba_resampling_kernels import NANOS_PER_SECOND
+from app.services import historical_data_service
+from app.tasks import data_processing_tasks
+
+SESSION_TOKEN = "test-session"
+REQUEST_RANGE_ID = f"chart_data_full:{SESSION_TOKEN}:NASDAQ:AAPL:2024-01-02T00:00:00:2024-01-04T00:00:00"
+
+
+class RecordingRedis:
+    """In-memory stand-in for the Redis commands the cache writers use."""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+        self.sets = {}
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+    def set(self, key, value, ex=None, nx=False, xx=False):
+        if (nx and key in self.values) or (xx and key not in self.values):
+            return None
+        self.values[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values or key in self.sets)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+
+class RecordingPipeline:
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._commands.append((getattr(self._client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = RecordingRedis()
+    for module in (cache, historical_data_service, data_processing_tasks):
+        monkeypatch.setattr(module, "redis_client", client)
+    monkeypatch.setattr(
+        historical_data_service.resample_and_cache_all_intervals_task, "delay", lambda **kwargs: None
+    )
+    return client
+
+
+def _one_second_columns(num_rows=7200):
+    timestamps = (1_704_153_600 + np.arange(num_rows, dtype=np.int64) * 30) * NANOS_PER_SECOND
+    columns = {name: np.linspace(1.0, 2.0, num_rows) for name in OHLCV_COLUMNS[1:]}
+    columns["timestamp"] = timestamps
+    return columns
+
+
+def _assert_session_keys_registered(client):
+    session_keys = [key for key in client.values if SESSION_TOKEN in key]
+    assert session_keys
+    registry_key = session_data_keys_key(SESSION_TOKEN)
+    registered = client.sets.get(registry_key, set())
+    assert set(session_keys) <= registered, set(session_keys) - registered
+    # The registry has to outlive every key it lists, or cleanup loses them.
+    assert all(client.ttls[registry_key] >= client.ttls[key] for key in session_keys)
+
+
+def test_day_caches_are_registered(fake_redis):
+    day_key = cache.build_ohlc_cache_key("NASDAQ", "AAPL", "1s", "2024-01-02", SESSION_TOKEN)
+    historical_data_service._write_day_caches(SESSION_TOKEN, [(day_key, _one_second_columns())])
+    _assert_session_keys_registered(fake_redis)
+
+
+@pytest.mark.parametrize("interval", ["1s", "5m", "1d"])
+def test_full_range_and_task_flag_are_registered(fake_redis, interval):
+    base_1s = _one_second_columns()
+    historical_data_service._cache_full_range(SESSION_TOKEN, REQUEST_RANGE_ID, interval, base_1s, base_1s)
+    historical_data_service._schedule_resampling(SESSION_TOKEN, REQUEST_RANGE_ID, interval)
+    assert f"{REQUEST_RANGE_ID}:{interval}" in fake_redis.values
+    assert f"{REQUEST_RANGE_ID}:task_triggered" in fake_redis.values
+    _assert_session_keys_registered(fake_redis)
+
+
+def test_pre_aggregated_intervals_are_registered(fake_redis):
+    base_1s = _one_second_columns()
+    historical_data_service._cache_full_range(SESSION_TOKEN, REQUEST_RANGE_ID, "1s", base_1s, base_1s)
+    data_processing_tasks._resample_and_cache_all_intervals(
+        f"{REQUEST_RANGE_ID}:1s", REQUEST_RANGE_ID, "1s", SESSION_TOKEN
+    )
+    assert f"{REQUEST_RANGE_ID}:1h" in fake_redis.values
+    _assert_session_keys_registered(fake_redis)